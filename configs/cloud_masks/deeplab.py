@@ -1,7 +1,11 @@
 _base_ = ["mmseg::deeplabv3plus/deeplabv3plus_r18b-d8_4xb2-80k_cityscapes-769x769.py"]
 
 custom_imports = dict(
-    imports=["geoai.data.cloud_masks", "geoai.hooks.visualization_hook"],
+    imports=[
+        "geoai.data.cloud_masks",
+        "geoai.hooks.visualization_hook",
+        "geoai.hooks.profiling_hook",
+    ],
     allow_failed_imports=False,
 )
 
@@ -68,6 +72,7 @@ meta_keys = (
     "flip_direction",
     "reduce_zero_label",
     "img_meta",
+    "timings",
 )
 PackSegInputs = dict(type="PackSegInputs", meta_keys=meta_keys)
 train_pipeline = [PackSegInputs]
@@ -125,6 +130,8 @@ default_hooks = dict(
     ),
 )
 
+custom_hooks = [dict(type="DataPipelineProfilingHook", interval=50)]
+
 # optimizer = dict(lr=0.01, momentum=0.9, type="SGD", weight_decay=0.0005)
 optimizer = dict(_delete_=True, type="Adam", lr=0.0003, weight_decay=0.0001)
 optim_wrapper = dict(clip_grad=None, optimizer=optimizer, type="OptimWrapper")
@@ -1,7 +1,11 @@
 _base_ = ["mmseg::deeplabv3plus/deeplabv3plus_r18b-d8_4xb2-80k_cityscapes-769x769.py"]
 
 custom_imports = dict(
-    imports=["geoai.data.human_settlements", "geoai.hooks.visualization_hook"],
+    imports=[
+        "geoai.data.human_settlements",
+        "geoai.hooks.visualization_hook",
+        "geoai.hooks.profiling_hook",
+    ],
     allow_failed_imports=False,
 )
 
@@ -65,6 +69,7 @@ meta_keys = (
     "flip_direction",
     "reduce_zero_label",
     "img_meta",
+    "timings",
 )
 PackSegInputs = dict(type="PackSegInputs", meta_keys=meta_keys)
 train_pipeline = [PackSegInputs]
@@ -113,5 +118,7 @@ default_hooks = dict(
     visualization=dict(type="CustomSegVisualizationHook", draw=True, interval=10),
 )
 
+custom_hooks = [dict(type="DataPipelineProfilingHook", interval=50)]
+
 optimizer = dict(lr=0.01, momentum=0.9, type="SGD", weight_decay=0.0005)
 optim_wrapper = dict(clip_grad=None, optimizer=optimizer, type="OptimWrapper")
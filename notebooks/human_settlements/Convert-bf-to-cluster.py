@@ -1,7 +1,7 @@
 # Standard Library
 from pathlib import Path
 
-from geoai.data.human_settlements import get_human_settlements_from_sentinel_image
+from geoai.data.human_settlements.utils import get_human_settlements_from_sentinel_image
 
 scenes = list(Path("/home/sandeep/workspace/data/human-settlements").glob("*/*.SAFE"))
 for i, scene in enumerate(scenes):
@@ -8,3 +8,11 @@ POSTGRES_DATA_DIR = WORK_DIR / "pgdata"
 POSTGRES_USER = "postgres"
 POSTGRES_PORT = 54320
 POSTGRES_DB_NAME = "geoai"
+
+# Connections per process, shared by all threads querying PostGIS
+POSTGRES_POOL_SIZE = 12
+POSTGRES_MAX_OVERFLOW = 4
+
+# Settlements per footprint tile and window, shared by scenes of the same area
+SETTLEMENT_CACHE_DIR = WORK_DIR / "settlement_cache"
+SETTLEMENT_CACHE_MAX_BYTES = 10 * 2**30
@@ -1,6 +1,21 @@
-from torch.utils.data import Dataset
+# Standard Library
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterator
+
+from mmengine.config import Config
+from mmengine.dataset import BaseDataset
+from mmengine.logging import print_log
+from mmengine.registry import init_default_scope
+from mmengine.utils import import_modules_from_strings
+from mmseg.registry import DATASETS
+from osgeo import gdal
+from torch.utils.data import ConcatDataset, Dataset, Subset
 
 from geoai.data.utils import Image, ImageTileIndexer
+from geoai.utils import timer
 
 
 class TileDataset(Dataset):
@@ -14,3 +29,175 @@ class TileDataset(Dataset):
     @property
     def indexer(self) -> ImageTileIndexer:
         raise NotImplementedError
+
+
+class TimedSceneDataset(BaseDataset):
+    """
+    Scene whose get_data_info records stage timings in the ``timings`` key.
+
+    The pipeline time is added once the pipeline is done. PackSegInputs deep
+    copies the metainfo into the data sample, so the timings are set on the
+    packed data sample again.
+    """
+
+    def prepare_data(self, idx: int) -> dict | None:
+        data_info = self.get_data_info(idx)
+        timings = data_info["timings"]
+        with timer(timings, "pipeline"):
+            packed = self.pipeline(data_info)
+        if packed is not None and "data_samples" in packed:
+            packed["data_samples"].set_metainfo({"timings": timings})
+        return packed
+
+
+def get_raster_files(path: Path | str) -> list[str]:
+    """
+    Files a raster is read from, e.g. the JP2 bands behind a Sentinel-2 subdataset.
+    """
+    ds = gdal.Open(str(path))
+    files = ds.GetFileList() if ds is not None else None
+    return files or [str(path)]
+
+
+def get_scene_subsets(dataset: ConcatDataset) -> list[tuple[Dataset, list[int]]]:
+    """
+    Scenes of a tiled ConcatDataset with the tile indexes used from each scene.
+    """
+    scenes = []
+    for subset in dataset.datasets:
+        if isinstance(subset, Subset):
+            scenes.append((subset.dataset, list(subset.indices)))
+        else:
+            scenes.append((subset, list(range(len(subset)))))
+    return scenes
+
+
+def get_scene_tiles(
+    scene_cls: type, scene_args: tuple, tile_size: int, label_coverage_threshold: float
+) -> dict:
+    """
+    Open a scene and select its tiles, runs in a worker process of prepare_scene_tiles.
+    """
+    scene = scene_cls(*scene_args, tile_size=tile_size)
+    length = len(scene)
+    if label_coverage_threshold > 0:
+        indexes = scene.get_subset(label_coverage_threshold).indices
+    else:
+        indexes = list(range(length))
+    return {
+        "width": scene.get_image().width,
+        "height": scene.get_image().height,
+        "nrows": scene.indexer.nrows,
+        "ncols": scene.indexer.ncols,
+        "length": length,
+        "indexes": [int(x) for x in indexes],
+    }
+
+
+def iter_scene_tiles(
+    scene_cls: type, scenes_args: list[tuple], args: tuple, max_workers: int
+) -> Iterator[tuple[int, dict | None, Exception | None]]:
+    """
+    Yield (scene position, get_scene_tiles result, error) in completion order.
+    """
+    if max_workers == 0:
+        for i, scene_args in enumerate(scenes_args):
+            try:
+                yield i, get_scene_tiles(scene_cls, scene_args, *args), None
+            except Exception as e:
+                yield i, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(get_scene_tiles, scene_cls, scene_args, *args): i
+            for i, scene_args in enumerate(scenes_args)
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+def prepare_scene_tiles(
+    scene_cls: type,
+    scenes_args: list[tuple],
+    tile_size: int,
+    label_coverage_threshold: float,
+    max_workers: int | None = None,
+) -> tuple[list[dict | None], list[dict]]:
+    """
+    Open scenes and compute their coverage on a process pool.
+
+    Scenes that fail are logged and returned as failures instead of aborting
+    the run. With max_workers=0 scenes are prepared in the current process.
+
+    Returns:
+        The get_scene_tiles result of every scene, None for failed scenes, and
+        the failures as {"scene": ..., "error": ...} dicts.
+    """
+    if max_workers is None:
+        max_workers = min(os.cpu_count(), 12)
+
+    tiles = [None] * len(scenes_args)
+    failures = []
+    args = (tile_size, label_coverage_threshold)
+    results = iter_scene_tiles(scene_cls, scenes_args, args, max_workers)
+    for done, (i, result, error) in enumerate(results, start=1):
+        scene = scenes_args[i][0]
+        if error is not None:
+            failures.append({"scene": str(scene), "error": repr(error)})
+            print_log(
+                f"scene={scene} status=failed error={error!r}",
+                logger="current",
+                level=logging.WARNING,
+            )
+            continue
+        tiles[i] = result
+        print_log(
+            f"scene={scene} status=prepared progress={done}/{len(scenes_args)}"
+            f" tiles={len(result['indexes'])}/{result['length']}",
+            logger="current",
+        )
+    return tiles, failures
+
+
+def build_scene_datasets(
+    scene_cls: type,
+    scenes_args: list[tuple],
+    tiles: list[dict | None],
+    tile_size: int,
+    label_coverage_threshold: float,
+    pipeline: list[dict] | None = None,
+    metainfo: dict | None = None,
+) -> list[Dataset]:
+    """
+    Scene datasets in the order of scenes_args, a Subset of the scene when
+    label_coverage_threshold > 0. Scenes without tiles are skipped.
+    """
+    datasets = []
+    for scene_args, scene_tiles in zip(scenes_args, tiles):
+        if scene_tiles is None:
+            continue
+        dataset = scene_cls(
+            *scene_args, tile_size=tile_size, pipeline=pipeline, metainfo=metainfo
+        )
+        if label_coverage_threshold > 0:
+            dataset = Subset(dataset, scene_tiles["indexes"])
+        datasets.append(dataset)
+
+    print_log(f"Prepared scenes: {len(datasets)}/{len(scenes_args)}", logger="current")
+    if not datasets:
+        raise Exception("No scene could be prepared")
+    return datasets
+
+
+def build_dataset(config: Path, split: str = "train") -> ConcatDataset:
+    cfg = Config.fromfile(config)
+    if cfg.get("custom_imports"):
+        import_modules_from_strings(**cfg.custom_imports)
+    init_default_scope(cfg.get("default_scope", "mmseg"))
+    dataset_cfg = cfg[f"{split}_dataloader"]["dataset"]
+    dataset_cfg["pipeline"] = None
+    return DATASETS.build(dataset_cfg)
@@ -0,0 +1,415 @@
+# Standard Library
+import argparse
+import json
+import multiprocessing
+import resource
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from osgeo import gdal, gdal_array, ogr, osr
+from torch.utils.data import DataLoader, Subset
+
+from geoai.data.base import get_scene_subsets
+from geoai.data.cloud_masks import CloudMaskDataset
+from geoai.data.human_settlements import HumanSettlementsDataset
+from geoai.data.human_settlements.label_cache import get_label_cache_state_path
+from geoai.data.sentinel import get_rgb_subdataset_path
+from geoai.data.utils import Image, ImageTileIndexer
+from geoai.data.utils.coverage import get_coverage_cache_path
+
+SYNTHETIC_EPSG = 32633
+SYNTHETIC_CELL_SIZE = 10.0
+SYNTHETIC_ORIGIN = (300000.0, 5000000.0)
+BENCHMARK_DATASETS = ["human_settlements", "cloud_mask", "indexer"]
+
+
+def create_synthetic_raster(
+    path: Path,
+    arr: np.ndarray,
+    driver: str = "GTiff",
+    options: list[str] | None = None,
+) -> Path:
+    """
+    Write a (bands, height, width) array georeferenced on the synthetic grid.
+    """
+    ds = gdal_array.OpenArray(arr)
+    ds.SetGeoTransform(
+        (
+            SYNTHETIC_ORIGIN[0],
+            SYNTHETIC_CELL_SIZE,
+            0,
+            SYNTHETIC_ORIGIN[1],
+            0,
+            -SYNTHETIC_CELL_SIZE,
+        )
+    )
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(SYNTHETIC_EPSG)
+    ds.SetSpatialRef(srs)
+    out_ds = gdal.GetDriverByName(driver).CreateCopy(
+        str(path), ds, options=options or []
+    )
+    out_ds.FlushCache()
+    return Path(path)
+
+
+def create_synthetic_labels(
+    path: Path, image: Image, count: int = 200, seed: int = 0
+) -> Path:
+    """
+    GeoPackage of count random rectangles inside the bounds of image.
+    """
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = image.bounds
+    ds = ogr.GetDriverByName("GPKG").CreateDataSource(str(path))
+    layer = ds.CreateLayer(
+        "settlements", srs=image.ds.GetSpatialRef(), geom_type=ogr.wkbPolygon
+    )
+    layer.StartTransaction()
+    for x, y, w, h in zip(
+        rng.uniform(xmin, xmax, count),
+        rng.uniform(ymin, ymax, count),
+        rng.uniform(50, 2000, count),
+        rng.uniform(50, 2000, count),
+    ):
+        wkt = f"POLYGON(({x} {y},{x + w} {y},{x + w} {y + h},{x} {y + h},{x} {y}))"
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+        layer.CreateFeature(feature)
+    layer.CommitTransaction()
+    ds = None
+    return Path(path)
+
+
+def create_human_settlements_data(
+    data_folder: Path, scenes: int = 2, size: int = 2048, seed: int = 0
+) -> Path:
+    """
+    SAFE like scenes with an RGB subdataset and QA label layers for HumanSettlementsDataset.
+
+    MTD_MSIL2A.xml is a two page GeoTIFF, GDAL lists its pages as subdatasets
+    like those of a real product, with the RGB page last.
+    """
+    rng = np.random.default_rng(seed)
+    options = ["TILED=YES", "COMPRESS=DEFLATE"]
+    (data_folder / "QA").mkdir(parents=True, exist_ok=True)
+    for i in range(scenes):
+        name = f"S2X_MSIL2A_SYNTHETIC_{i:03d}"
+        safe = data_folder / f"{name}.SAFE"
+        safe.mkdir(parents=True, exist_ok=True)
+        path = safe / "MTD_MSIL2A.xml"
+        create_synthetic_raster(
+            path,
+            rng.integers(0, 2**14, (1, size, size), dtype=np.uint16),
+            options=options,
+        )
+        create_synthetic_raster(
+            path,
+            rng.integers(0, 256, (3, size, size), dtype=np.uint8),
+            options=options + ["APPEND_SUBDATASET=YES"],
+        )
+        create_synthetic_labels(
+            data_folder / "QA" / f"{name}.gpkg",
+            Image.from_path(get_rgb_subdataset_path(safe)),
+            seed=seed + i,
+        )
+    return data_folder
+
+
+def create_cloud_mask_data(
+    data_folder: Path, scenes: int = 2, size: int = 2048, seed: int = 0
+) -> Path:
+    """
+    uint16 GeoTIFF scenes with blocky cloud masks for CloudMaskDataset.
+    """
+    rng = np.random.default_rng(seed)
+    (data_folder / "image").mkdir(parents=True, exist_ok=True)
+    (data_folder / "mask").mkdir(parents=True, exist_ok=True)
+    block = 64
+    for i in range(scenes):
+        create_synthetic_raster(
+            data_folder / "image" / f"train_image_{i}.tif",
+            rng.integers(0, 2**14, (3, size, size), dtype=np.uint16),
+            options=["TILED=YES", "COMPRESS=DEFLATE"],
+        )
+        cells = -(-size // block)
+        clouds = (rng.random((cells, cells)) > 0.6).astype(np.uint8)
+        mask = np.kron(clouds, np.ones((block, block), dtype=np.uint8))
+        create_synthetic_raster(
+            data_folder / "mask" / f"train_mask_{i}.tif",
+            mask[np.newaxis, :size, :size],
+            options=["TILED=YES", "COMPRESS=DEFLATE"],
+        )
+    return data_folder
+
+
+def get_git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_peak_rss_mb() -> dict:
+    """
+    Peak resident set size of this process and of its largest finished child.
+    """
+    # ru_maxrss is in kilobytes on Linux
+    return {
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_rss_children_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        / 1024,
+    }
+
+
+def get_latency_stats(latencies: list[float]) -> dict:
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    return {"latency_p50_ms": float(p50), "latency_p99_ms": float(p99)}
+
+
+def collate_tile(tile: dict) -> dict:
+    return tile
+
+
+def build_dataset(
+    name: str, data_folder: Path, tile_size: int
+) -> HumanSettlementsDataset | CloudMaskDataset:
+    dataset_cls = {
+        "human_settlements": HumanSettlementsDataset,
+        "cloud_mask": CloudMaskDataset,
+    }[name]
+    return dataset_cls(
+        data_folder, tile_size=tile_size, max_workers=0, use_manifest=False
+    )
+
+
+def benchmark_indexer(image_path: Path, tile_size: int) -> dict:
+    start = time.perf_counter()
+    indexer = ImageTileIndexer(Image.from_path(image_path), tile_size)
+    latencies = []
+    for i in range(len(indexer)):
+        tile_start = time.perf_counter()
+        _ = indexer[i]
+        _ = indexer.index_to_bbox(i)
+        latencies.append(time.perf_counter() - tile_start)
+    seconds = time.perf_counter() - start
+    return {
+        "tiles": len(indexer),
+        "seconds": seconds,
+        "tiles_per_second": len(indexer) / seconds,
+        **get_latency_stats(latencies),
+    }
+
+
+def benchmark_dataset(
+    name: str, data_folder: Path, tile_size: int, workers: int, samples: int
+) -> dict:
+    """
+    Time dataset preparation, get_data_info per tile and DataLoader throughput.
+
+    Preparation includes the label rasterization and coverage of every scene.
+    Latency is measured in this process on freshly opened scenes, so the first
+    tiles of each scene include opening the rasters. Throughput is measured
+    afterwards with ``workers`` DataLoader workers.
+    """
+    start = time.perf_counter()
+    dataset = build_dataset(name, data_folder, tile_size)
+    prepare_seconds = time.perf_counter() - start
+
+    tiles = [
+        (scene, index)
+        for scene, indexes in get_scene_subsets(dataset)
+        for index in indexes
+    ]
+    step = max(len(tiles) // samples, 1)
+    tiles = tiles[::step][:samples]
+    latencies = []
+    for scene, index in tiles:
+        tile_start = time.perf_counter()
+        _ = scene.get_data_info(index)
+        latencies.append(time.perf_counter() - tile_start)
+
+    indexes = list(range(0, len(dataset), max(len(dataset) // samples, 1)))[:samples]
+    loader = DataLoader(
+        Subset(dataset, indexes),
+        batch_size=None,
+        num_workers=workers,
+        collate_fn=collate_tile,
+    )
+    start = time.perf_counter()
+    for _ in loader:
+        pass
+    seconds = time.perf_counter() - start
+    return {
+        "prepare_seconds": prepare_seconds,
+        "tiles": len(indexes),
+        "seconds": seconds,
+        "tiles_per_second": len(indexes) / seconds,
+        **get_latency_stats(latencies),
+    }
+
+
+def run_case(case: dict, queue: multiprocessing.Queue) -> None:
+    if case["dataset"] == "indexer":
+        result = benchmark_indexer(Path(case["image_path"]), case["tile_size"])
+    else:
+        result = benchmark_dataset(
+            case["dataset"],
+            Path(case["data_folder"]),
+            case["tile_size"],
+            case["workers"],
+            case["samples"],
+        )
+    queue.put({**case, **result, **get_peak_rss_mb()})
+
+
+def get_cases(
+    work_dir: Path,
+    datasets: list[str],
+    tile_sizes: list[int],
+    workers: list[int],
+    samples: int,
+) -> list[dict]:
+    cases = []
+    for dataset in datasets:
+        for tile_size in tile_sizes:
+            if dataset == "indexer":
+                image_path = next((work_dir / "cloud_mask" / "image").glob("*.tif"))
+                cases.append(
+                    {
+                        "dataset": dataset,
+                        "tile_size": tile_size,
+                        "image_path": str(image_path),
+                    }
+                )
+                continue
+            for n in workers:
+                cases.append(
+                    {
+                        "dataset": dataset,
+                        "tile_size": tile_size,
+                        "workers": n,
+                        "samples": samples,
+                        "data_folder": str(work_dir / dataset),
+                    }
+                )
+    return cases
+
+
+def clear_label_caches(work_dir: Path, tile_sizes: list[int]) -> None:
+    """
+    Remove the label caches and tile coverage caches of the synthetic scenes.
+    """
+    label_caches = list(work_dir.glob("human_settlements/*.labels.tif"))
+    masks = list(work_dir.glob("cloud_mask/mask/*.tif"))
+    for path in label_caches + masks:
+        for tile_size in tile_sizes:
+            get_coverage_cache_path(path, tile_size).unlink(missing_ok=True)
+    for path in label_caches:
+        get_label_cache_state_path(path).unlink(missing_ok=True)
+        path.unlink()
+
+
+def run_benchmarks(
+    work_dir: Path,
+    out_path: Path,
+    datasets: list[str] | None = None,
+    tile_sizes: list[int] | None = None,
+    workers: list[int] | None = None,
+    samples: int = 200,
+    scenes: int = 2,
+    size: int = 2048,
+) -> dict:
+    """
+    Benchmark the data loading on synthetic scenes and write the results to out_path.
+
+    Every case runs in a fresh process so that peak RSS and the dataset pool
+    are not shared between cases. The scenes are created once in work_dir and
+    reused by later runs, their label and coverage caches are removed before
+    every case so label rasterization is always part of the measurement.
+    """
+    datasets = datasets or BENCHMARK_DATASETS
+    tile_sizes = tile_sizes or [256, 512]
+    workers = workers or [0, 4]
+    work_dir = Path(work_dir)
+
+    if not (work_dir / "human_settlements").exists():
+        create_human_settlements_data(work_dir / "human_settlements", scenes, size)
+    if not (work_dir / "cloud_mask").exists():
+        create_cloud_mask_data(work_dir / "cloud_mask", scenes, size)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    cases = get_cases(work_dir, datasets, tile_sizes, workers, samples)
+    for i, case in enumerate(cases):
+        clear_label_caches(work_dir, tile_sizes)
+        print(f"Benchmark ({i + 1}/{len(cases)}): {case}")
+        queue = ctx.Queue()
+        process = ctx.Process(target=run_case, args=(case, queue))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            results.append({**case, "error": f"exit code {process.exitcode}"})
+            continue
+        result = queue.get()
+        print(
+            f"tiles/s: {result['tiles_per_second']:.1f}"
+            f" p50: {result['latency_p50_ms']:.2f}ms"
+            f" p99: {result['latency_p99_ms']:.2f}ms"
+        )
+        results.append(result)
+
+    report = {
+        "git_commit": get_git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "gdal_version": gdal.__version__,
+        "scenes": scenes,
+        "size": size,
+        "results": results,
+    }
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Data loading benchmarks")
+    parser.add_argument("--work-dir", type=Path, default=Path("benchmark_data"))
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument(
+        "--datasets", nargs="+", choices=BENCHMARK_DATASETS, default=None
+    )
+    parser.add_argument("--tile-sizes", nargs="+", type=int, default=None)
+    parser.add_argument("--workers", nargs="+", type=int, default=None)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--scenes", type=int, default=2)
+    parser.add_argument("--size", type=int, default=2048)
+    args = parser.parse_args()
+
+    out_path = args.out
+    if out_path is None:
+        out_path = Path(f"benchmark-{(get_git_commit() or 'unknown')[:8]}.json")
+    run_benchmarks(
+        args.work_dir,
+        out_path,
+        datasets=args.datasets,
+        tile_sizes=args.tile_sizes,
+        workers=args.workers,
+        samples=args.samples,
+        scenes=args.scenes,
+        size=args.size,
+    )
+    print(f"Results written to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
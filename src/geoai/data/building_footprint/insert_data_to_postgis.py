@@ -6,6 +6,7 @@ from pathlib import Path
 import geopandas as gpd
 import pandas as pd
 from shapely import wkt
+from sqlalchemy import text
 
 from geoai import config
 from geoai.data.admin import get_countries
@@ -71,7 +72,8 @@ def create_view(table_names: list[str]) -> None:
     """
     print(f"-- Creating View: {VIEW_NAME}")
     with get_connection() as con:
-        con.execute(query)
+        con.execute(text(query))
+        con.commit()
     print(f"-- Created View: {VIEW_NAME}")
 
 
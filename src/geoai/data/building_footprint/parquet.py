@@ -0,0 +1,171 @@
+# Standard Library
+import argparse
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import shapely
+from shapely.geometry import Polygon
+
+from geoai.data.admin import get_countries
+from geoai.data.building_footprint import insert_data_to_postgis as gbf
+from geoai.utils import download_file
+
+PARQUET_DIR = gbf.GBF_WORKDIR / gbf.VERSION / "parquet"
+PARQUET_SUFFIX = "_buildings.parquet"
+ROW_GROUP_SIZE = 50000
+BBOX_COLUMNS = ["xmin", "ymin", "xmax", "ymax"]
+# Every worker holds a whole tile in memory while sorting it
+CONVERT_MAX_WORKERS = 4
+
+
+def get_tile_id(url: str) -> str:
+    return Path(url).name.split("_")[0]
+
+
+def get_parquet_path(tile_id: str) -> Path:
+    return PARQUET_DIR / f"{tile_id}{PARQUET_SUFFIX}"
+
+
+def convert_tile(csv_path: Path, out_path: Path) -> Path:
+    """
+    Convert an Open Buildings CSV to GeoParquet sorted along a Hilbert curve.
+
+    Rows are written in row groups of ROW_GROUP_SIZE with the bounds of every
+    building in the xmin, ymin, xmax and ymax columns. Since neighbouring
+    buildings share row groups, the statistics of these columns let readers
+    skip all row groups outside of a window. The whole tile is held in memory
+    for the sort, main runs at most CONVERT_MAX_WORKERS conversions at once.
+    """
+    chunks = []
+    with pd.read_csv(csv_path, chunksize=gbf.CHUNK_SIZE) as reader:
+        for chunk in reader:
+            chunk["geometry"] = shapely.from_wkt(chunk["geometry"].values)
+            chunks.append(chunk)
+    gdf = gpd.GeoDataFrame(pd.concat(chunks), geometry="geometry", crs=4326)
+    del chunks
+    gdf = gdf.explode(index_parts=False)
+    gdf = gdf.iloc[np.argsort(gdf.hilbert_distance().values, kind="stable")]
+    gdf[BBOX_COLUMNS] = gdf.bounds.values
+    gdf = gdf.reset_index(drop=True)
+
+    out_path_temp = out_path.with_suffix(f".{os.getpid()}.tmp")
+    gdf.to_parquet(out_path_temp, row_group_size=ROW_GROUP_SIZE)
+    shutil.move(out_path_temp, out_path)
+    return out_path
+
+
+def convert_url(url: str) -> Path:
+    out_path = get_parquet_path(get_tile_id(url))
+    if out_path.exists():
+        print(f"-- Skipping tile: {out_path.name} exists !")
+        return out_path
+    workdir = gbf.GBF_WORKDIR / gbf.VERSION
+    workdir.mkdir(parents=True, exist_ok=True)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    csv_path = download_file(url, workdir, exists_ok=True)
+    print(f"-- Converting {csv_path} to {out_path}")
+    return convert_tile(csv_path, out_path)
+
+
+def get_file_bounds(path: Path) -> tuple[float, float, float, float]:
+    """
+    Bounds of all buildings of a converted tile from its row group statistics.
+    """
+    metadata = pq.ParquetFile(path).metadata
+    names = metadata.schema.names
+    columns = [names.index(x) for x in BBOX_COLUMNS]
+    bounds = np.array(
+        [
+            [metadata.row_group(i).column(j).statistics.min for j in columns[:2]]
+            + [metadata.row_group(i).column(j).statistics.max for j in columns[2:]]
+            for i in range(metadata.num_row_groups)
+        ]
+    )
+    return (*bounds[:, :2].min(0), *bounds[:, 2:].max(0))
+
+
+def get_parquet_tiles(parquet_dir: Path = PARQUET_DIR) -> gpd.GeoDataFrame:
+    """
+    Converted tiles with their bounds, the local counterpart of get_tiles.
+    """
+    paths = sorted(Path(parquet_dir).glob(f"*{PARQUET_SUFFIX}"))
+    return gpd.GeoDataFrame(
+        {
+            "tile_id": [x.name[: -len(PARQUET_SUFFIX)] for x in paths],
+            "path": paths,
+        },
+        geometry=[shapely.box(*get_file_bounds(x)) for x in paths],
+        crs=4326,
+    )
+
+
+def read_footprints(path: Path, bounds: tuple[float, ...]) -> np.ndarray:
+    """
+    Buildings of a converted tile whose bounds intersect bounds in EPSG:4326.
+
+    Row groups are pruned by the statistics of the bounds columns, only the
+    remaining row groups are read and filtered.
+    """
+    xmin, ymin, xmax, ymax = bounds
+    table = pq.read_table(
+        path,
+        columns=["geometry"],
+        filters=[
+            ("xmax", ">=", xmin),
+            ("xmin", "<=", xmax),
+            ("ymax", ">=", ymin),
+            ("ymin", "<=", ymax),
+        ],
+    )
+    return shapely.from_wkb(table.column("geometry").to_numpy(zero_copy_only=False))
+
+
+def get_window_settlements(
+    path: Path, window: Polygon, roi_crs: int, buffer_distance: int
+) -> np.ndarray:
+    """
+    Buffered union of the buildings of one tile intersecting window, in roi_crs.
+
+    The in process counterpart of the PostGIS window query.
+    """
+    window_4326 = gpd.GeoSeries([window], crs=roi_crs).to_crs(4326).iloc[0]
+    buildings = read_footprints(path, window_4326.bounds)
+    buildings = buildings[shapely.intersects(buildings, window_4326)]
+    if not len(buildings):
+        return np.empty(0, dtype=object)
+    buildings = gpd.GeoSeries(buildings, crs=4326).to_crs(roi_crs).to_numpy()
+    buffered = shapely.buffer(
+        buildings, buffer_distance, cap_style="square", join_style="mitre"
+    )
+    return shapely.get_parts(shapely.union_all(buffered))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert footprints to GeoParquet")
+    parser.add_argument("--country", default="India")
+    parser.add_argument(
+        "--max-workers", type=int, default=min(os.cpu_count(), CONVERT_MAX_WORKERS)
+    )
+    args = parser.parse_args()
+
+    cdf = get_countries()
+    country_geom = cdf[cdf["NAME_EN"] == args.country].unary_union
+    tiles_df = gbf.get_tiles()
+    urls = tiles_df[tiles_df.intersects(country_geom)]["tile_url"].values
+
+    with ProcessPoolExecutor(max_workers=args.max_workers) as pool:
+        futures = [pool.submit(convert_url, url) for url in urls]
+        for i, future in enumerate(as_completed(futures)):
+            print(f"Converted tile : {i}/{len(futures)}", end="\r")
+            future.result()
+    print(f"Converted tiles: {len(futures)}")
+
+
+if __name__ == "__main__":
+    main()
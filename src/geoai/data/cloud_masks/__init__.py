@@ -7,11 +7,15 @@ from pathlib import Path
 import numpy as np
 import torch
 from matplotlib import pyplot as plt
-from mmengine.dataset import BaseDataset
 from mmseg.registry import DATASETS
 from torch.utils.data import ConcatDataset, Subset
 
-from geoai.data.utils import Image, ImageTileIndexer
+from geoai.data import stats as dataset_stats
+from geoai.data.base import TimedSceneDataset
+from geoai.data.manifest import load_scenes
+from geoai.data.utils import Image, ImageTileIndexer, stretch_to_uint8
+from geoai.data.utils.coverage import get_tile_coverage
+from geoai.utils import timer
 
 
 @DATASETS.register_module()
@@ -25,66 +29,61 @@ class CloudMaskDataset(ConcatDataset):
         label_coverage_threshold: float = 0.01,
         image_dir: str = "image",
         mask_dir: str = "mask",
+        max_workers: int | None = None,
+        use_manifest: bool = True,
     ) -> None:
         self.label_coverage_threshold = label_coverage_threshold
         self.data_folder = Path(data_folder)
-        scenes = list((self.data_folder / image_dir).rglob("*.tif"))
-        datasets = []
-        for i, scene in enumerate(scenes):
-            idx = scene.stem.split("_")[-1]
-            label_file = Path(data_folder) / mask_dir / f"train_mask_{idx}.tif"
-            dataset = CloudMaskScene(
-                scene,
-                label_file,
-                tile_size=tile_size,
-                pipeline=pipeline,
-                metainfo=metainfo,
-            )
-            if label_coverage_threshold > 0:
-                subset = dataset.get_subset(label_coverage_threshold)
-            else:
-                subset = dataset
-            datasets.append(subset)
-            m = f"Prepared Dataset: ({i}/{len(scenes)}) {scene} filtered ({len(subset)}/{len(dataset)})"
-            print(m, " " * 5, end="\r")
-        print("")
+        self.image_dir = image_dir
+        self.mask_dir = mask_dir
+        datasets, self.failed_scenes = load_scenes(
+            CloudMaskScene,
+            self.find_scenes,
+            self.data_folder,
+            "cloud_mask",
+            tile_size,
+            label_coverage_threshold,
+            pipeline=pipeline,
+            metainfo=metainfo,
+            max_workers=max_workers,
+            use_manifest=use_manifest,
+            scene_params={"image_dir": image_dir, "mask_dir": mask_dir},
+        )
         super().__init__(datasets)
         if label_coverage_threshold > 0:
             self.metainfo = self.datasets[0].dataset.metainfo
         else:
             self.metainfo = self.datasets[0].metainfo
 
+    def find_scenes(self) -> list[tuple[Path, Path]]:
+        scenes = list((self.data_folder / self.image_dir).rglob("*.tif"))
+        scenes_args = []
+        for scene in scenes:
+            idx = scene.stem.split("_")[-1]
+            label_file = self.data_folder / self.mask_dir / f"train_mask_{idx}.tif"
+            scenes_args.append((scene, label_file))
+        return scenes_args
+
     def get_stats(self, force_recalculate: bool = False) -> dict:
         image_stats_file = self.data_folder / "cloud_mask_image_stats.json"
         if not image_stats_file.exists() or force_recalculate:
             image_stats = self.calculate_image_stats()
-            for k in image_stats:
-                image_stats[k] = image_stats[k].tolist()
             with open(image_stats_file, "w") as f:
                 json.dump(image_stats, f)
         else:
             with open(image_stats_file) as f:
                 image_stats = json.load(f)
-            for k in image_stats:
-                image_stats[k] = np.array(image_stats[k], dtype=np.float32)
         return {"image_stats": image_stats}
 
     def calculate_image_stats(self) -> dict:
-        mean_store = []
-        variance_store = []
-        for i, dataset in enumerate(self.datasets):
-            m = f"Calculating stats: ({i}/{len(self.datasets)})"
-            print(m, " " * 5, end="\r")
-            if self.label_coverage_threshold > 0:
-                dataset = dataset.dataset
-            stats = dataset.get_image().get_stats()
-            mean_store.append(stats["mean"])
-            variance_store.append(stats["variance"])
-        print("")
-
-        std = np.stack(variance_store).mean(axis=0) ** 0.5
-        mean = np.stack(mean_store).mean(axis=0)
-        return {"mean": mean, "std": std}
+        """
+        Config ready ``mean`` and ``std`` for SegDataPreProcessor.
+        """
+        stats = dataset_stats.compute_dataset_stats(
+            dataset_stats.get_dataset_image_paths(self),
+            cache_dir=self.data_folder / dataset_stats.STATS_CACHE_DIR_NAME,
+        )
+        return dataset_stats.get_preprocessor_config(stats)
 
 
 class CloudMaskTile(dict):
@@ -93,15 +92,11 @@ class CloudMaskTile(dict):
         ax: plt.axes = None,
         alpha: float = 0.7,
         percent_clip: list[int] | None = None,
+        histogram: np.ndarray | None = None,
     ) -> plt.axes:
-        if percent_clip is None:
-            percent_clip = [0, 100]
         if ax is None:
             _, ax = plt.subplots()
-        min, max = np.percentile(self["img"].reshape(-1, 3), percent_clip, axis=0)
-        arr = (self["img"] - min) / (max - min)
-        arr = np.clip(arr, 0, 1)
-        ax.imshow(arr)
+        ax.imshow(stretch_to_uint8(self["img"], percent_clip, histogram))
         color_map = np.pad(self["color_map"], ((0, 0), (0, 1)))
         color_map[1:, 3] = int(alpha * 255)
         sem_seg = color_map[self["gt_seg_map"]]
@@ -109,7 +104,7 @@ class CloudMaskTile(dict):
         return ax
 
 
-class CloudMaskScene(BaseDataset):
+class CloudMaskScene(TimedSceneDataset):
     METAINFO = {
         "classes": ["background", "cloud"],
         "palette": [[0, 0, 0], [245, 66, 66]],
@@ -126,6 +121,7 @@ class CloudMaskScene(BaseDataset):
         self.image_filepath = Path(image)
         self.mask_filepath = Path(mask)
         self.tile_size = tile_size
+        self._indexer = None
         super().__init__(serialize_data=False, pipeline=pipeline, metainfo=metainfo)
 
     def __len__(self) -> int:
@@ -133,7 +129,9 @@ class CloudMaskScene(BaseDataset):
 
     @property
     def indexer(self) -> ImageTileIndexer:
-        return ImageTileIndexer(self.get_image(), self.tile_size)
+        if self._indexer is None:
+            self._indexer = ImageTileIndexer(self.get_image(), self.tile_size)
+        return self._indexer
 
     def full_init(self) -> None:
         super().full_init()
@@ -142,8 +140,14 @@ class CloudMaskScene(BaseDataset):
     def load_data_list(self) -> list:
         return []
 
+    def get_image_path(self) -> Path:
+        return self.image_filepath
+
     def get_image(self) -> Image:
-        return Image.from_path(self.image_filepath)
+        return Image.from_pool(self.image_filepath)
+
+    def get_label(self) -> Image:
+        return Image.from_pool(self.mask_filepath)
 
     def get_image_tile(self, index: int) -> Image:
         top_y, left_x = self.indexer.index_to_offset(index)
@@ -162,28 +166,38 @@ class CloudMaskScene(BaseDataset):
         return Image.from_meta(meta=meta)
 
     def get_data_info(self, index: int) -> CloudMaskTile:
-        res = self.indexer[0]
+        res = self.indexer[index]
         res["img_path"] = self.image_filepath
         res["seg_map_path"] = self.mask_filepath
-        image_tile = self.get_image_tile(index)
-        label_tile = self.get_label_tile(index)
         res["color_map"] = self.color_map
-        arr = np.transpose(image_tile.ds.ReadAsArray(), (1, 2, 0))
-        if arr.dtype == np.uint16:
-            arr = arr.astype(np.int32)
-        res["img"] = arr
+        res["timings"] = timings = {}
+        top_y, left_x = res["offset_y"], res["offset_x"]
+        with timer(timings, "read_image"):
+            image = self.get_image()
+            dtype = np.int32 if image.dtype == np.uint16 else image.dtype
+            arr = np.empty((self.tile_size, self.tile_size, image.count), dtype=dtype)
+            res["img"] = image.read_window(
+                left_x, top_y, self.tile_size, self.tile_size, out=arr
+            )
         res["ori_shape"] = res["img"].shape[:2]
-        res["img_meta"] = image_tile.meta
-        res["gt_seg_map"] = label_tile.ds.ReadAsArray()
+        res["img_meta"] = {
+            "path": self.image_filepath,
+            "srcWin": [left_x, top_y, self.tile_size, self.tile_size],
+        }
+        with timer(timings, "read_label"):
+            label = self.get_label()
+            res["gt_seg_map"] = label.read_window(
+                left_x,
+                top_y,
+                self.tile_size,
+                self.tile_size,
+                out=np.empty((self.tile_size, self.tile_size), dtype=label.dtype),
+            )
         return CloudMaskTile(res)
 
     def get_label_coverage(self) -> torch.Tensor:
-        label_coverage = torch.zeros(len(self), dtype=torch.float)
-        for idx in range(len(self)):
-            label_pixels = self.get_label_tile(idx).ds.ReadAsArray().sum()
-            total_pixels = self.tile_size * self.tile_size
-            label_coverage[idx] = label_pixels / total_pixels
-        return label_coverage
+        coverage = get_tile_coverage(self.mask_filepath, self.tile_size)
+        return torch.from_numpy(coverage).float()
 
     def get_subset(self, label_coverage_threshold: float = 0.01) -> Subset:
         indexes = torch.argwhere(self.get_label_coverage() > label_coverage_threshold)[
@@ -1,15 +1,22 @@
 # Standard Library
+import json
 from pathlib import Path
 
 import numpy as np
 import torch
 from matplotlib import pyplot as plt
-from mmengine.dataset import BaseDataset
 from mmseg.registry import DATASETS
-from osgeo import gdal, ogr
+from osgeo import gdal
 from torch.utils.data import ConcatDataset, Subset
 
-from geoai.data.utils import Image, ImageTileIndexer
+from geoai.data import stats as dataset_stats
+from geoai.data.base import TimedSceneDataset
+from geoai.data.human_settlements import label_cache
+from geoai.data.manifest import load_scenes
+from geoai.data.sentinel import get_rgb_subdataset_path
+from geoai.data.utils import Image, ImageTileIndexer, stretch_to_uint8
+from geoai.data.utils.coverage import get_tile_coverage
+from geoai.utils import timer
 
 
 def get_color_map() -> np.array:
@@ -25,43 +32,77 @@ class HumanSettlementsDataset(ConcatDataset):
         pipeline: list[dict] | None = None,
         metainfo: dict | None = None,
         label_coverage_threshold: float = 0.01,
+        max_workers: int | None = None,
+        use_manifest: bool = True,
     ) -> None:
-        sentinel_scenes = list(Path(data_folder).rglob("*.SAFE"))
-        labels = {
-            **{x.name: x for x in Path(data_folder).rglob("**/QA/*.gpkg")},
-            **{x.name: x for x in Path(data_folder).rglob("**/fakeQA/*.gpkg")},
-        }
-        datasets = []
-        for i, sentinel_scene in enumerate(sentinel_scenes):
-            label_file = sentinel_scene.with_suffix(".gpkg").name
-            if label_file in labels:
-                dataset = HumanSettlementsScene(
-                    sentinel_scene,
-                    labels[label_file],
-                    tile_size=tile_size,
-                    pipeline=pipeline,
-                    metainfo=metainfo,
-                )
-                if label_coverage_threshold > 0:
-                    subset = dataset.get_subset(label_coverage_threshold)
-                else:
-                    subset = dataset
-                datasets.append(subset)
-                m = f"Prepared Dataset: ({i}/{len(sentinel_scenes)}) {sentinel_scene} filtered ({len(subset)}/{len(dataset)})"
-                print(m, " " * 5, end="\r")
-        print("")
+        self.data_folder = Path(data_folder)
+        datasets, self.failed_scenes = load_scenes(
+            HumanSettlementsScene,
+            self.find_scenes,
+            self.data_folder,
+            "human_settlements",
+            tile_size,
+            label_coverage_threshold,
+            pipeline=pipeline,
+            metainfo=metainfo,
+            max_workers=max_workers,
+            use_manifest=use_manifest,
+        )
         super().__init__(datasets)
         if label_coverage_threshold > 0:
             self.metainfo = self.datasets[0].dataset.metainfo
         else:
             self.metainfo = self.datasets[0].metainfo
 
+    def find_scenes(self) -> list[tuple[Path, Path]]:
+        sentinel_scenes = list(self.data_folder.rglob("*.SAFE"))
+        labels = {
+            **{x.name: x for x in self.data_folder.rglob("**/QA/*.gpkg")},
+            **{x.name: x for x in self.data_folder.rglob("**/fakeQA/*.gpkg")},
+        }
+        scenes_args = []
+        for sentinel_scene in sentinel_scenes:
+            label_file = sentinel_scene.with_suffix(".gpkg").name
+            if label_file in labels:
+                scenes_args.append((sentinel_scene, labels[label_file]))
+        return scenes_args
+
+    def get_stats(self, force_recalculate: bool = False) -> dict:
+        image_stats_file = self.data_folder / "human_settlements_image_stats.json"
+        if not image_stats_file.exists() or force_recalculate:
+            image_stats = self.calculate_image_stats()
+            with open(image_stats_file, "w") as f:
+                json.dump(image_stats, f)
+        else:
+            with open(image_stats_file) as f:
+                image_stats = json.load(f)
+        return {"image_stats": image_stats}
+
+    def calculate_image_stats(self) -> dict:
+        """
+        Config ready ``mean`` and ``std`` for SegDataPreProcessor.
+        """
+        stats = dataset_stats.compute_dataset_stats(
+            dataset_stats.get_dataset_image_paths(self),
+            cache_dir=self.data_folder / dataset_stats.STATS_CACHE_DIR_NAME,
+        )
+        return dataset_stats.get_preprocessor_config(stats)
+
 
 class HumanSettlementsTile(dict):
-    def plot(self, ax: plt.axes = None, alpha: float = 0.7) -> plt.axes:
+    def plot(
+        self,
+        ax: plt.axes = None,
+        alpha: float = 0.7,
+        percent_clip: list[int] | None = None,
+        histogram: np.ndarray | None = None,
+    ) -> plt.axes:
         if ax is None:
             _, ax = plt.subplots()
-        ax.imshow(self["img"])
+        img = self["img"]
+        if percent_clip is not None or histogram is not None:
+            img = stretch_to_uint8(img, percent_clip, histogram)
+        ax.imshow(img)
         color_map = np.copy(self["color_map"])
         color_map[:, 3] = int(alpha * 255)
         sem_seg = color_map[self["gt_seg_map"]]
@@ -69,7 +110,7 @@ class HumanSettlementsTile(dict):
         return ax
 
 
-class HumanSettlementsScene(BaseDataset):
+class HumanSettlementsScene(TimedSceneDataset):
     METAINFO = {
         "classes": ["background", "settlements"],
         "palette": [[0, 0, 0], [245, 66, 66]],
@@ -86,10 +127,11 @@ class HumanSettlementsScene(BaseDataset):
         self.sentinel_image = Path(sentinel_image)
         self.human_settlements_filepath = Path(human_settlements_filepath)
         self.tile_size = tile_size
+        self.label_cache_path = label_cache.get_label_cache_path(self.sentinel_image)
 
         self._image_path = None
-        self._image = None
-        self._label = None
+        self._indexer = None
+        self._label_cache_ready = False
 
         super().__init__(serialize_data=False, pipeline=pipeline, metainfo=metainfo)
 
@@ -98,7 +140,9 @@ class HumanSettlementsScene(BaseDataset):
 
     @property
     def indexer(self) -> ImageTileIndexer:
-        return ImageTileIndexer(self.get_image(), self.tile_size)
+        if self._indexer is None:
+            self._indexer = ImageTileIndexer(self.get_image(), self.tile_size)
+        return self._indexer
 
     def full_init(self) -> None:
         super().full_init()
@@ -111,15 +155,11 @@ class HumanSettlementsScene(BaseDataset):
 
     def get_image_path(self) -> Path:
         if self._image_path is None:
-            im = Image.from_path(f"{self.sentinel_image}/MTD_MSIL2A.xml")
-            ds_RGB_path = im.ds.GetSubDatasets()[-1][0]
-            self._image_path = ds_RGB_path
+            self._image_path = get_rgb_subdataset_path(self.sentinel_image)
         return self._image_path
 
     def get_image(self) -> Image:
-        if self._image is None:
-            self._image = Image.from_path(self.get_image_path())
-        return self._image
+        return Image.from_pool(self.get_image_path())
 
     def get_image_tile(self, index: int) -> Image:
         top_y, left_x = self.indexer.index_to_offset(index)
@@ -129,56 +169,58 @@ class HumanSettlementsScene(BaseDataset):
         }
         return Image.from_meta(meta=meta)
 
-    def get_label_tile(self, index: int) -> Image:
-        return self._get_label_tile(self.get_image_tile(index))
+    def get_label_cache(self) -> Path:
+        """
+        Path of the scene labels rasterized once to disk, rebuilt when the gpkg changes.
+        """
+        if not self._label_cache_ready:
+            label_cache.get_label_cache(
+                self.get_image(), self.human_settlements_filepath, self.label_cache_path
+            )
+            self._label_cache_ready = True
+        return self.label_cache_path
 
-    def _get_label_tile(self, image_tile: Image) -> Image:
-        label_ds = ogr.Open(str(self.human_settlements_filepath))
-        lyr_name = label_ds.GetLayer().GetDescription()
-        label_layer = label_ds.ExecuteSQL(
-            f"SELECT * FROM {lyr_name}", ogr.CreateGeometryFromWkb(image_tile.bbox.wkb)
-        )
-        label_tile = get_label_like(image_tile)
-        label_tile.ds
-        _ = gdal.RasterizeLayer(label_tile.ds, [1], label_layer, burn_values=[1])
-        del label_ds, label_layer
-        return label_tile
+    def get_label_tile(self, index: int) -> Image:
+        top_y, left_x = self.indexer.index_to_offset(index)
+        meta = {
+            "path": self.get_label_cache(),
+            "srcWin": [left_x, top_y, self.tile_size, self.tile_size],
+        }
+        return Image.from_meta(meta=meta)
 
     def get_label(self) -> Image:
-        """
-        Not to be used within a data loader.
-        """
-        if self._label is None:
-            label_ds = ogr.Open(str(self.human_settlements_filepath))
-            label_layer = label_ds.GetLayer()
-            label_image = get_label_like(self.get_image())
-            _ = gdal.RasterizeLayer(label_image.ds, [1], label_layer, burn_values=[1])
-            self._label = label_image
-        return self._label
+        return Image.from_pool(self.get_label_cache())
 
     def get_data_info(self, index: int) -> HumanSettlementsTile:
-        res = self.indexer[0]
+        res = self.indexer[index]
         res["img_path"] = self.sentinel_image
         res["seg_map_path"] = self.human_settlements_filepath
-        image_tile = self.get_image_tile(index)
-        label_tile = self._get_label_tile(image_tile)
         res["color_map"] = self.color_map
-        res["img"] = np.transpose(image_tile.ds.ReadAsArray(), (1, 2, 0))
+        res["timings"] = timings = {}
+        top_y, left_x = res["offset_y"], res["offset_x"]
+        with timer(timings, "read_image"):
+            res["img"] = self.get_image().read_window(
+                left_x, top_y, self.tile_size, self.tile_size
+            )
         res["ori_shape"] = res["img"].shape[:2]
-        res["img_meta"] = image_tile.meta
-        res["gt_seg_map"] = label_tile.ds.ReadAsArray()
+        res["img_meta"] = {
+            "path": self.get_image_path(),
+            "srcWin": [left_x, top_y, self.tile_size, self.tile_size],
+        }
+        # Includes rasterizing the label cache on first use
+        with timer(timings, "read_label"):
+            res["gt_seg_map"] = self.get_label().read_window(
+                left_x,
+                top_y,
+                self.tile_size,
+                self.tile_size,
+                out=np.empty((self.tile_size, self.tile_size), dtype=np.uint8),
+            )
         return HumanSettlementsTile(res)
 
     def get_label_coverage(self) -> torch.Tensor:
-        label_coverage = torch.zeros(len(self), dtype=torch.float)
-        label = self.get_label()
-        for i in range(len(self)):
-            top, left = self.indexer.index_to_offset(i)
-            ysize, xsize = self.indexer.index_to_valid_pixels(i)
-            label_pixels = label.ds.ReadAsArray(left, top, xsize, ysize).sum()
-            total_pixels = self.tile_size * self.tile_size
-            label_coverage[i] = label_pixels / total_pixels
-        return label_coverage
+        coverage = get_tile_coverage(self.get_label_cache(), self.tile_size)
+        return torch.from_numpy(coverage).float()
 
     def get_subset(self, label_coverage_threshold: float = 0.01) -> Subset:
         indexes = torch.argwhere(self.get_label_coverage() > label_coverage_threshold)[
@@ -0,0 +1,123 @@
+# Standard Library
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from osgeo import gdal, ogr
+
+from geoai.data.utils import Image, get_pool
+
+LABEL_CACHE_SUFFIX = ".labels.tif"
+LABEL_CACHE_STATE_SUFFIX = ".state.json"
+LABEL_CACHE_BLOCK_SIZE = 512
+MTIME_KEY = "SOURCE_MTIME"
+HASH_KEY = "SOURCE_SHA256"
+
+
+def get_file_hash(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(10 * 2**20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def get_label_cache_path(sentinel_image: Path) -> Path:
+    return Path(sentinel_image).with_suffix(LABEL_CACHE_SUFFIX)
+
+
+def get_label_cache_state_path(cache_path: Path) -> Path:
+    return Path(f"{cache_path}{LABEL_CACHE_STATE_SUFFIX}")
+
+
+def read_label_cache_state(cache_path: Path) -> dict:
+    try:
+        with open(get_label_cache_state_path(cache_path)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_label_cache_state(cache_path: Path, mtime: str, sha: str) -> None:
+    state_path = get_label_cache_state_path(cache_path)
+    state_path_temp = state_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(state_path_temp, "w") as f:
+        json.dump({MTIME_KEY: mtime, HASH_KEY: sha}, f)
+    os.replace(state_path_temp, state_path)
+
+
+def is_label_cache_valid(cache_path: Path, source_path: Path) -> bool:
+    """
+    The cache is valid when it was built from a file with the same content as source_path.
+
+    The hash is only computed when the modification time changed. A matching hash
+    records the new modification time in a sidecar state file so later checks
+    stay cheap. The GeoTIFF itself is never modified in place, other processes
+    may be reading it.
+    """
+    if not cache_path.exists():
+        return False
+    ds = gdal.Open(str(cache_path))
+    if ds is None:
+        return False
+    mtime = str(os.stat(source_path).st_mtime_ns)
+    sha = ds.GetMetadataItem(HASH_KEY)
+    if ds.GetMetadataItem(MTIME_KEY) == mtime:
+        return True
+    state = read_label_cache_state(cache_path)
+    if state.get(MTIME_KEY) == mtime and state.get(HASH_KEY) == sha:
+        return True
+    if sha != get_file_hash(source_path):
+        return False
+    write_label_cache_state(cache_path, mtime, sha)
+    return True
+
+
+def build_label_cache(image: Image, source_path: Path, cache_path: Path) -> Path:
+    """
+    Rasterize all polygons of source_path on the grid of image into a tiled, compressed GeoTIFF.
+    """
+    cache_path_temp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    mtime = str(os.stat(source_path).st_mtime_ns)
+    sha = get_file_hash(source_path)
+
+    ds = gdal.GetDriverByName("GTiff").Create(
+        str(cache_path_temp),
+        image.width,
+        image.height,
+        bands=1,
+        eType=gdal.GDT_Byte,
+        options=[
+            "TILED=YES",
+            f"BLOCKXSIZE={LABEL_CACHE_BLOCK_SIZE}",
+            f"BLOCKYSIZE={LABEL_CACHE_BLOCK_SIZE}",
+            "COMPRESS=DEFLATE",
+            "SPARSE_OK=TRUE",
+        ],
+    )
+    ds.SetGeoTransform(image.ds.GetGeoTransform())
+    ds.SetSpatialRef(image.ds.GetSpatialRef())
+    ds.GetRasterBand(1).SetNoDataValue(0)
+    ds.SetMetadataItem(MTIME_KEY, mtime)
+    ds.SetMetadataItem(HASH_KEY, sha)
+
+    label_ds = ogr.Open(str(source_path))
+    label_layer = label_ds.GetLayer()
+    _ = gdal.RasterizeLayer(ds, [1], label_layer, burn_values=[1])
+    ds.FlushCache()
+    del ds, label_layer, label_ds
+
+    # A pooled handle would still point at the replaced file
+    get_pool().discard(cache_path)
+    shutil.move(cache_path_temp, cache_path)
+    return cache_path
+
+
+def get_label_cache(image: Image, source_path: Path, cache_path: Path) -> Path:
+    cache_path = Path(cache_path)
+    source_path = Path(source_path)
+    if not is_label_cache_valid(cache_path, source_path):
+        build_label_cache(image, source_path, cache_path)
+    return cache_path
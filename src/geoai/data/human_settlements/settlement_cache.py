@@ -0,0 +1,112 @@
+# Standard Library
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import shapely
+
+from geoai import config
+from geoai.data.building_footprint.insert_data_to_postgis import VERSION
+
+SETTLEMENT_CACHE_SUFFIX = ".wkb"
+
+
+class SettlementCache:
+    """
+    Persistent cache of the settlements of one window and footprint tile.
+
+    Entries are keyed by the hash of the footprint tile id, the footprint data
+    VERSION, the window bounds, the CRS and the buffer distance, so scenes of
+    the same ground window on different dates share their entries. Every entry
+    is a WKB GeometryCollection file. Reading an entry updates its mtime, when
+    the cache grows beyond max_bytes the least recently used entries are
+    removed until it is below 90% of max_bytes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = config.SETTLEMENT_CACHE_DIR,
+        max_bytes: int = config.SETTLEMENT_CACHE_MAX_BYTES,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = None
+
+    @staticmethod
+    def get_key(
+        tile_id: str,
+        bounds: tuple[float, float, float, float],
+        crs: int,
+        buffer_distance: int,
+    ) -> str:
+        key = json.dumps(
+            [VERSION, str(tile_id), [float(x) for x in bounds], crs, buffer_distance]
+        )
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def get_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{SETTLEMENT_CACHE_SUFFIX}"
+
+    def get_entries(self) -> list[tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.cache_dir.glob(f"*/*{SETTLEMENT_CACHE_SUFFIX}"):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                # Evicted by another process
+                continue
+        return entries
+
+    def get(self, key: str) -> np.ndarray | None:
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return shapely.get_parts(shapely.from_wkb(data))
+
+    def put(self, key: str, geometries: np.ndarray) -> None:
+        path = self.get_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = shapely.to_wkb(shapely.geometrycollections(list(geometries)))
+        path_temp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(path_temp, "wb") as f:
+            f.write(data)
+        os.replace(path_temp, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(st.st_size for _, st in self.get_entries())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache is below 90% of max_bytes.
+        """
+        entries = sorted(self.get_entries(), key=lambda x: x[1].st_mtime_ns)
+        size = sum(st.st_size for _, st in entries)
+        for path, st in entries:
+            if size <= 0.9 * self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= st.st_size
+        self._size = size
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -1,20 +1,35 @@
 # Standard Library
+import itertools
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
 from pathlib import Path
+from typing import Callable
 
 import geopandas as gpd
 import numpy as np
 import pandas as pd
-from osgeo import gdal
-from shapely.geometry import Polygon, box
+import shapely
+from shapely.geometry import Polygon
+from sqlalchemy import text
 
-from geoai.data.building_footprint.insert_data_to_postgis import get_tiles
+from geoai.data.building_footprint import parquet
+from geoai.data.building_footprint.insert_data_to_postgis import VIEW_NAME, get_tiles
+from geoai.data.human_settlements.settlement_cache import SettlementCache
+from geoai.data.sentinel import get_rgb_subdataset_path
 from geoai.data.utils.image import Image
+from geoai.data.utils.seams import SeamMerger
 from geoai.db.postgres import get_connection
 
 # from memory_profiler import profile
 
+QUERY_MODES = ("windows", "server")
+BACKENDS = ("postgis", "parquet")
+SERVER_SIDE_CHUNK_SIZE = 10000
+SEAM_MARGIN = 5
+POSTPROCESS_CHUNK_SIZE = 10000
+# Reads submitted ahead of the merge, per worker of read_windows
+PENDING_READS_PER_WORKER = 2
+
 
 def get_human_settlements_from_sentinel_image(
     image_path: Path, **kwargs: dict
@@ -26,132 +41,459 @@ def get_human_settlements_from_sentinel_image(
     df = get_human_settlements('/pathto/S2B_MSIL2A_20230518T050659_N0509_R019_T43PGQ_20230518T091909.SAFE')
 
     """
-    ds = gdal.Open(f"{image_path}/MTD_MSIL2A.xml")
-    ds_RGB = gdal.Open(ds.GetSubDatasets()[-1][0])
-    im = Image.from_gdal(ds_RGB)
+    im = Image.from_path(get_rgb_subdataset_path(image_path))
     gdf = gpd.GeoDataFrame(geometry=[im.bbox], crs=im.crs)
     return get_human_settlements_from_df(gdf, **kwargs)
 
 
-def remove_holes(geom: Polygon, area: float) -> Polygon:
-    holes = []
-    for hole in geom.interiors:
-        if Polygon(hole).area > area:
-            holes.append(hole)
-    return Polygon(geom.exterior, holes)
+def remove_holes(geometries: np.ndarray, area: float) -> np.ndarray:
+    """
+    Polygons of geometries without their holes of at most area.
+
+    Vectorized over the array, only polygons with holes are rebuilt.
+    """
+    geometries = np.array(geometries, dtype=object)
+    counts = shapely.get_num_interior_rings(geometries)
+    with_holes = np.flatnonzero(counts > 0)
+    if not len(with_holes):
+        return geometries
+    polygons, counts = geometries[with_holes], counts[with_holes]
+
+    # Polygon and ring number of every hole
+    owners = np.repeat(np.arange(len(polygons)), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    holes = shapely.get_interior_ring(polygons[owners], np.arange(len(owners)) - starts)
+    keep = shapely.area(shapely.polygons(holes)) > area
+
+    # The first ring of every index is the shell, the others are holes
+    rings = np.concatenate([shapely.get_exterior_ring(polygons), holes[keep]])
+    indices = np.concatenate([np.arange(len(polygons)), owners[keep]])
+    order = np.argsort(indices, kind="stable")
+    geometries[with_holes] = shapely.polygons(rings[order], indices=indices[order])
+    return geometries
 
 
 def get_dataframe(query: str, buffer_distance: int) -> gpd.GeoDataFrame:
     with get_connection() as conn:
         df = gpd.read_postgis(query, con=conn, geom_col="geometry")
-    df["geometry"] = df["geometry"].apply(
-        lambda x: remove_holes(x, buffer_distance * buffer_distance * 4)
+    df["geometry"] = remove_holes(
+        df["geometry"].values, buffer_distance * buffer_distance * 4
     )
     return df
 
 
+def postprocess(geometries: np.ndarray, buffer_distance: int) -> np.ndarray:
+    """
+    Undo half of the buffer and drop parts too small to be visible in Sentinel.
+    """
+    geometries = shapely.buffer(
+        geometries, -buffer_distance / 2, cap_style="flat", join_style="mitre"
+    )
+    parts = shapely.get_parts(geometries)
+    # Remove stray buildings not visible in Sentinel
+    eroded = shapely.buffer(
+        parts, -buffer_distance, cap_style="flat", join_style="mitre"
+    )
+    return parts[shapely.area(eroded) > (buffer_distance * buffer_distance * 4)]
+
+
+def postprocess_parallel(
+    geometries: list[Polygon],
+    buffer_distance: int,
+    executor: Executor,
+    chunk_size: int = POSTPROCESS_CHUNK_SIZE,
+) -> np.ndarray:
+    """
+    postprocess on chunks of geometries in parallel, shapely releases the GIL.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    chunks = np.array_split(geometries, max(-(-len(geometries) // chunk_size), 1))
+    results = executor.map(postprocess, chunks, [buffer_distance] * len(chunks))
+    return np.concatenate([np.empty(0, dtype=object), *results])
+
+
+def get_grid_axes(
+    roi_df: gpd.GeoDataFrame, grid_size: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Lower x and y of the window columns and rows covering the bounds of roi_df.
+    """
+    bounds = roi_df.total_bounds
+    xmins = np.arange(bounds[0], bounds[2], grid_size)
+    ymins = np.arange(bounds[1], bounds[3], grid_size)
+    return xmins, ymins
+
+
+def get_windows(roi_df: gpd.GeoDataFrame, grid_size: int) -> gpd.GeoDataFrame:
+    """
+    Square windows of grid_size covering the bounds of roi_df, row by row.
+    """
+    xmins, ymins = get_grid_axes(roi_df, grid_size)
+    xmins, ymins = [x.ravel() for x in np.meshgrid(xmins, ymins)]
+    geometry = shapely.box(xmins, ymins, xmins + grid_size, ymins + grid_size)
+    return gpd.GeoDataFrame(geometry=geometry, crs=roi_df.crs)
+
+
+def get_window_tiles(
+    windows: gpd.GeoDataFrame, tiles: gpd.GeoDataFrame
+) -> pd.DataFrame:
+    """
+    Every (window, tile_id) pair of intersecting windows and footprint tiles.
+
+    Windows are reprojected in one call and matched with the spatial index of
+    sjoin, the index of the result is the index of the window.
+    """
+    with np.errstate(invalid="ignore"):
+        windows = windows.to_crs(tiles.crs)
+    pairs = gpd.sjoin(
+        windows, tiles[["tile_id", "geometry"]], how="inner", predicate="intersects"
+    )
+    return pairs[["tile_id"]].sort_index(kind="stable")
+
+
+def get_window_query(
+    table_name: str, window_wkt: str, roi_crs: int, buffer_distance: int
+) -> str:
+    return f"""
+    SELECT
+        (ST_DUMP(ST_UNION(
+            ST_Buffer(
+                ST_Transform(
+                    geometry,
+                    {roi_crs}
+                ),
+                {buffer_distance},
+                'endcap=square join=mitre'
+            )
+        ))).geom AS geometry
+    FROM
+        {table_name}
+    WHERE
+        ST_Intersects(
+            geometry,
+            ST_Transform(
+                ST_GeomFromText('{window_wkt}', {roi_crs}),
+                4326
+            )
+        )
+    """
+
+
+def get_server_side_query(
+    roi_df: gpd.GeoDataFrame, grid_size: int, buffer_distance: int
+) -> str:
+    """
+    One statement computing the buffered union of buildings for every window of the ROI grid.
+
+    The grid of get_windows is generated in PostGIS with generate_series and
+    joined against the VIEW_NAME view of all footprint tables.
+    """
+    roi_crs = roi_df.crs.to_epsg()
+    xmin, ymin, _, _ = roi_df.total_bounds
+    ncols, nrows = [len(x) for x in get_grid_axes(roi_df, grid_size)]
+    return f"""
+    WITH grid AS (
+        SELECT
+            grid_row,
+            grid_col,
+            ST_MakeEnvelope(
+                {xmin} + grid_col * {grid_size},
+                {ymin} + grid_row * {grid_size},
+                {xmin} + (grid_col + 1) * {grid_size},
+                {ymin} + (grid_row + 1) * {grid_size},
+                {roi_crs}
+            ) AS cell
+        FROM
+            generate_series(0, {nrows - 1}) AS grid_row,
+            generate_series(0, {ncols - 1}) AS grid_col
+    )
+    SELECT
+        grid.grid_row,
+        grid.grid_col,
+        (ST_DUMP(ST_UNION(
+            ST_Buffer(
+                ST_Transform(
+                    b.geometry,
+                    {roi_crs}
+                ),
+                {buffer_distance},
+                'endcap=square join=mitre'
+            )
+        ))).geom AS geometry
+    FROM
+        grid
+        JOIN {VIEW_NAME} AS b
+        ON ST_Intersects(b.geometry, ST_Transform(grid.cell, 4326))
+    GROUP BY
+        grid.grid_row, grid.grid_col
+    """
+
+
+def get_postgis_reader(
+    windows: gpd.GeoDataFrame, roi_crs: int, buffer_distance: int
+) -> Callable[[int, str], np.ndarray]:
+    """
+    Settlements of a window and footprint tile from their PostGIS table.
+    """
+    window_wkts = shapely.to_wkt(windows.geometry.values, rounding_precision=-1)
+
+    def read_window(window: int, tile_id: str) -> np.ndarray:
+        table_name = f"gbf_{tile_id}_buildings"
+        query = get_window_query(
+            table_name, window_wkts[window], roi_crs, buffer_distance
+        )
+        return get_dataframe(query, buffer_distance)["geometry"].values
+
+    return read_window
+
+
+def get_parquet_reader(
+    windows: gpd.GeoDataFrame,
+    tiles: gpd.GeoDataFrame,
+    roi_crs: int,
+    buffer_distance: int,
+) -> Callable[[int, str], np.ndarray]:
+    """
+    Settlements of a window and footprint tile from its local GeoParquet file.
+    """
+    paths = dict(zip(tiles["tile_id"], tiles["path"]))
+    window_geometries = windows.geometry.values
+
+    def read_window(window: int, tile_id: str) -> np.ndarray:
+        geometries = parquet.get_window_settlements(
+            paths[tile_id], window_geometries[window], roi_crs, buffer_distance
+        )
+        return remove_holes(geometries, buffer_distance * buffer_distance * 4)
+
+    return read_window
+
+
+def get_cached_reader(
+    read_window: Callable[[int, str], np.ndarray],
+    cache: SettlementCache,
+    windows: gpd.GeoDataFrame,
+    roi_crs: int,
+    buffer_distance: int,
+) -> Callable[[int, str], np.ndarray]:
+    """
+    read_window that returns the settlements of a cached window and tile without reading.
+    """
+    bounds = shapely.bounds(windows.geometry.values)
+
+    def cached_read_window(window: int, tile_id: str) -> np.ndarray:
+        key = cache.get_key(tile_id, bounds[window], roi_crs, buffer_distance)
+        geometries = cache.get(key)
+        if geometries is None:
+            geometries = read_window(window, tile_id)
+            cache.put(key, geometries)
+        return geometries
+
+    return cached_read_window
+
+
+def read_windows(
+    windows: gpd.GeoDataFrame,
+    tiles: gpd.GeoDataFrame,
+    merger: SeamMerger,
+    read_window: Callable[[int, str], np.ndarray],
+    max_workers: int,
+) -> list[Polygon]:
+    """
+    Settlements of every window, one read_window call per window and footprint tile on a thread pool.
+
+    A window is added to merger as soon as all its tiles returned. Reads are
+    submitted in window order and at most PENDING_READS_PER_WORKER per worker
+    are in flight, so finished windows are merged while the rest of the grid
+    is still read and results do not pile up in memory.
+
+    Returns:
+        The polygons that merger finalized.
+    """
+    window_tiles = get_window_tiles(windows, tiles)
+    tiles_per_window = window_tiles.index.value_counts().to_dict()
+    pending = dict(tiles_per_window)
+    # Windows without footprint tiles have nothing to wait for
+    merger.done.flat[np.setdiff1d(np.arange(len(windows)), list(pending))] = True
+
+    final = []
+    reads = iter(zip(window_tiles.index, window_tiles["tile_id"]))
+    max_pending = PENDING_READS_PER_WORKER * max_workers
+    print(f"Reading total windows {len(window_tiles)}")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        results = {}
+        done_reads = 0
+        while True:
+            for window, tile_id in itertools.islice(reads, max_pending - len(futures)):
+                futures[pool.submit(read_window, window, tile_id)] = window
+            if not futures:
+                break
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                done_reads += 1
+                print(f"Read window : {done_reads}/{len(window_tiles)}", end="\r")
+                window = futures.pop(future)
+                results.setdefault(window, []).extend(future.result())
+                pending[window] -= 1
+                if pending[window] == 0:
+                    row, col = divmod(window, merger.shape[1])
+                    dissolve = tiles_per_window[window] > 1
+                    final.extend(merger.add(row, col, results.pop(window), dissolve))
+        print(f"Read all windows: {len(window_tiles)}              ")
+    return final
+
+
+def read_windows_server_side(
+    roi_df: gpd.GeoDataFrame,
+    merger: SeamMerger,
+    grid_size: int,
+    buffer_distance: int,
+    max_workers: int,
+) -> list[Polygon]:
+    """
+    Settlements of every window from a single parallel statement, streamed in chunks.
+
+    PostgreSQL never runs a parallel plan for a cursor, so the statement fills
+    a temporary table with up to max_workers parallel workers, which is then
+    streamed back through a server side cursor in window order. A window is
+    added to merger once the rows of the next window arrive.
+
+    Returns:
+        The polygons that merger finalized.
+    """
+    query = get_server_side_query(roi_df, grid_size, buffer_distance)
+    ncols = merger.shape[1]
+    final = []
+    current, geometries = -1, []
+
+    def add_window(window: int) -> None:
+        # Windows without buildings are skipped by the query
+        skipped = slice(current + 1, window)
+        merger.done.flat[skipped] = True
+        row, col = divmod(current, ncols)
+        final.extend(merger.add(row, col, geometries))
+
+    with get_connection() as conn:
+        conn.execute(text(f"SET LOCAL max_parallel_workers_per_gather = {max_workers}"))
+        conn.execute(text(f"CREATE TEMP TABLE settlements ON COMMIT DROP AS {query}"))
+        chunks = gpd.read_postgis(
+            """
+            SELECT grid_row, grid_col, geometry
+            FROM settlements
+            ORDER BY grid_row, grid_col
+            """,
+            con=conn.execution_options(stream_results=True),
+            geom_col="geometry",
+            chunksize=SERVER_SIDE_CHUNK_SIZE,
+        )
+        for i, df in enumerate(chunks):
+            print(f"Read chunk : {i}", end="\r")
+            df["geometry"] = remove_holes(
+                df["geometry"].values, buffer_distance * buffer_distance * 4
+            )
+            df_windows = (df["grid_row"] * ncols + df["grid_col"]).values
+            for window, geometry in zip(df_windows, df["geometry"].values):
+                if window != current:
+                    if current >= 0:
+                        add_window(window)
+                    else:
+                        # Windows before the first one with buildings
+                        merger.done.flat[:window] = True
+                    current, geometries = window, []
+                geometries.append(geometry)
+        print("Read all chunks              ")
+        conn.rollback()
+    if current >= 0:
+        add_window(merger.done.size)
+    return final
+
+
 # @profile
 def get_human_settlements_from_df(
     roi_df: gpd.GeoDataFrame,
     grid_size: int = 10000,  # meters
     buffer_distance: int = 25,  # meters
     max_workers: int = None,
+    mode: str = "windows",
+    backend: str = "postgis",
+    cache: SettlementCache | None = None,
     # simplification_tolerance=10,
 ) -> gpd.GeoDataFrame:
     """
     roi_df should be in projected coordinate system.
+
+    With backend="postgis" footprints are queried from the PostGIS container.
+    With mode="windows" every window and footprint tile is queried separately,
+    with mode="server" the whole grid is computed by PostGIS in one statement.
+    With backend="parquet" footprints are read from the local GeoParquet files
+    of building_footprint.parquet, no database is needed.
+
+    The settlements of every window and footprint tile are looked up in cache
+    before they are read, a default SettlementCache is used when cache is
+    None. mode="server" computes all windows in one statement and does not
+    use the cache.
+
+    Windows are dissolved incrementally with a SeamMerger, polygons away from
+    window seams are final as soon as their window is read and only polygons
+    near seams are held until their neighbours are read.
     """
-    bounds = roi_df.total_bounds
+    if mode not in QUERY_MODES:
+        raise Exception(f"Unknown mode: {mode}, expected one of {QUERY_MODES}")
+    if backend not in BACKENDS:
+        raise Exception(f"Unknown backend: {backend}, expected one of {BACKENDS}")
+    if backend == "parquet" and mode == "server":
+        raise Exception("mode='server' requires backend='postgis'")
+
     roi_crs = roi_df.crs.to_epsg()
-    ymins = np.arange(bounds[1], bounds[3], grid_size)
-    xmins = np.arange(bounds[0], bounds[2], grid_size)
-    print(f"Total windows : {len(ymins)*len(xmins)}")
+    windows = get_windows(roi_df, grid_size)
+    xmins, ymins = get_grid_axes(roi_df, grid_size)
+    print(f"Total windows : {len(windows)}")
 
     if max_workers is None:
         max_workers = min(os.cpu_count(), 12)
 
-    with get_connection() as _:
-        pass
-
-    tdf = get_tiles()
+    if backend == "postgis":
+        with get_connection() as _:
+            pass
 
+    # Reads run on their own pools, so seam unions never queue behind them
     with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        futures = []
-        counter = 0
-        for ymin in ymins:
-            for xmin in xmins:
-                window_bbox = box(xmin, ymin, xmin + grid_size, ymin + grid_size)
-                with np.errstate(invalid="ignore"):
-                    bbox_4326 = (
-                        gpd.GeoDataFrame(geometry=[window_bbox], crs=roi_crs)
-                        .to_crs(tdf.crs)
-                        .geometry.values[0]
-                    )
-                    tile_ids = tdf[tdf.intersects(bbox_4326)]["tile_id"].values
-                for tile_id in tile_ids:
-                    counter += 1
-                    table_name = f"gbf_{tile_id}_buildings"
-                    query = f"""
-                    SELECT
-                        (ST_DUMP(ST_UNION(
-                            ST_Buffer(
-                                ST_Transform(
-                                    geometry,
-                                    {roi_crs}
-                                ),
-                                {buffer_distance},
-                                'endcap=square join=mitre'
-                            )
-                        ))).geom AS geometry
-                    FROM
-                        {table_name}
-                    WHERE
-                        ST_Intersects(
-                            geometry,
-                            ST_Transform(
-                                ST_GeomFromText('{window_bbox.wkt}', {roi_crs}),
-                                4326
-                            )
-                        )
-                    """
-                    future = pool.submit(get_dataframe, query, buffer_distance)
-                    futures.append(future)
-
-        print(f"Reading total windows {len(futures)}")
-        df_store = []
-        for i, future in enumerate(as_completed(futures)):
-            print(f"Read window : {i}/{len(futures)}", end="\r")
-            df = future.result()
-            if len(df) > 0:
-                df_store.append(df)
-        print(f"Read all windows: {len(futures)}              ")
-        del futures
-
-    print("Concat data")
-    if not df_store:
-        return gpd.GeoDataFrame()
-    df = gpd.GeoDataFrame(pd.concat(df_store), crs=roi_crs)
-    del df_store
-
-    # df["geometry"] = df["geometry"].apply(
-    #     lambda x: remove_holes(x, buffer_distance * buffer_distance * 4)
-    # )
+        merger = SeamMerger(
+            (xmins[0], ymins[0]),
+            (grid_size, grid_size),
+            (len(ymins), len(xmins)),
+            # Buffered buildings of a window reach up to the mitre limit
+            # (5 in PostGIS) times buffer_distance into its neighbours
+            margin=SEAM_MARGIN * buffer_distance,
+            executor=pool,
+        )
+        if mode == "server":
+            final = read_windows_server_side(
+                roi_df, merger, grid_size, buffer_distance, max_workers
+            )
+        else:
+            if backend == "parquet":
+                tiles = parquet.get_parquet_tiles()
+                read_window = get_parquet_reader(
+                    windows, tiles, roi_crs, buffer_distance
+                )
+            else:
+                tiles = get_tiles()
+                read_window = get_postgis_reader(windows, roi_crs, buffer_distance)
+            if cache is None:
+                cache = SettlementCache()
+            read_window = get_cached_reader(
+                read_window, cache, windows, roi_crs, buffer_distance
+            )
+            final = read_windows(windows, tiles, merger, read_window, max_workers)
+            print(f"Settlement cache hit ratio: {cache.hit_ratio():.2f}")
+        final.extend(merger.flush())
 
-    print("Dissolve to merge windows, rows:", len(df))
-    df = df.dissolve().explode(index_parts=False).reset_index(drop=True)
+        print("Reverse buffer, rows:", len(final))
+        geometries = postprocess_parallel(final, buffer_distance, pool)
+        del final
 
-    print("Reverse buffer, rows:", len(df))
-    df["geometry"] = df.buffer(
-        -buffer_distance / 2, cap_style="flat", join_style="mitre"
-    )
-
-    print("Remove stray buildings not visible in Sentinel, rows:", len(df))
-    # Remove stray buildings not visible in Sentinel
-    df = df.explode(index_parts=False).reset_index(drop=True)
-    df = df[
-        df.buffer(-buffer_distance, cap_style="flat", join_style="mitre").area
-        > (buffer_distance * buffer_distance * 4)
-    ]
-
-    print("Done, rows:", len(df))
-    return df
+    print("Done, rows:", len(geometries))
+    if not len(geometries):
+        return gpd.GeoDataFrame()
+    return gpd.GeoDataFrame(geometry=geometries, crs=roi_crs)
@@ -0,0 +1,163 @@
+# Standard Library
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable
+
+from mmengine.logging import print_log
+from torch.utils.data import Dataset, Subset
+
+from geoai.data.base import build_scene_datasets, get_raster_files, prepare_scene_tiles
+
+MANIFEST_VERSION = 3
+
+
+def get_manifest_path(
+    data_folder: Path,
+    name: str,
+    tile_size: int,
+    label_coverage_threshold: float,
+    scene_params: dict | None = None,
+) -> Path:
+    """
+    Manifest path of one dataset configuration, scene_params are the parameters
+    of the scene discovery, e.g. the image and mask directories.
+    """
+    key = f"{tile_size}_{label_coverage_threshold}"
+    if scene_params:
+        params = json.dumps(scene_params, sort_keys=True, default=str)
+        key += "_" + hashlib.sha1(params.encode()).hexdigest()[:12]
+    return Path(data_folder) / f".{name}_manifest_{key}.json"
+
+
+def get_file_state(path: Path | str) -> list[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def get_scene_params_state(scene_params: dict | None) -> dict:
+    # Round trip through json so params compare equal to the loaded manifest
+    return json.loads(json.dumps(scene_params or {}, sort_keys=True, default=str))
+
+
+def get_scene_files(dataset: Dataset, scene_args: tuple) -> list[str]:
+    """
+    Files the scene is read from, the files its image resolves to and its file arguments.
+
+    A .SAFE directory keeps its size and mtime when the bands inside it are
+    rewritten, so the bands are recorded instead of the directory.
+    """
+    scene = dataset.dataset if isinstance(dataset, Subset) else dataset
+    files = get_raster_files(scene.get_image_path())
+    files += [str(path) for path in scene_args if Path(path).is_file()]
+    return sorted(set(files))
+
+
+def load_manifest(manifest_path: Path, scene_params: dict | None = None) -> dict | None:
+    """
+    The manifest at manifest_path, None when missing, when it was written for
+    other scene_params or when a recorded file changed.
+    """
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    if manifest.get("scene_params") != get_scene_params_state(scene_params):
+        print_log(f"Manifest {manifest_path} has other scene params", logger="current")
+        return None
+    for path, state in manifest["files"].items():
+        if not os.path.exists(path) or get_file_state(path) != state:
+            print_log(f"Manifest outdated, {path} changed", logger="current")
+            return None
+    return manifest
+
+
+def save_manifest(manifest_path: Path, manifest: dict) -> None:
+    manifest_path_temp = manifest_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(manifest_path_temp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path_temp, manifest_path)
+
+
+def load_scenes(
+    scene_cls: type,
+    find_scenes: Callable[[], list[tuple]],
+    data_folder: Path,
+    name: str,
+    tile_size: int,
+    label_coverage_threshold: float,
+    pipeline: list[dict] | None = None,
+    metainfo: dict | None = None,
+    max_workers: int | None = None,
+    use_manifest: bool = True,
+    scene_params: dict | None = None,
+) -> tuple[list[Dataset], list[dict]]:
+    """
+    Scene datasets from the manifest of data_folder, scanned and prepared when it is outdated.
+
+    The manifest records the scene and label paths, raster sizes, tile grids and
+    selected tiles for one tile_size and label_coverage_threshold, together with
+    the size and mtime of every scene and label file. Scenes added to the data
+    folder later are only picked up with use_manifest=False, which rescans and
+    rewrites the manifest. It is only written when all scenes could be prepared.
+    scene_params holds the parameters find_scenes depends on, datasets on the
+    same data folder with other scene_params use their own manifest.
+    """
+    manifest_path = get_manifest_path(
+        data_folder, name, tile_size, label_coverage_threshold, scene_params
+    )
+    manifest = load_manifest(manifest_path, scene_params) if use_manifest else None
+    if manifest is not None:
+        scenes_args = [
+            tuple(Path(x) for x in scene["args"]) for scene in manifest["scenes"]
+        ]
+        tiles = [scene["tiles"] for scene in manifest["scenes"]]
+        failures = []
+    else:
+        scenes_args = find_scenes()
+        tiles, failures = prepare_scene_tiles(
+            scene_cls, scenes_args, tile_size, label_coverage_threshold, max_workers
+        )
+
+    datasets = build_scene_datasets(
+        scene_cls,
+        scenes_args,
+        tiles,
+        tile_size,
+        label_coverage_threshold,
+        pipeline=pipeline,
+        metainfo=metainfo,
+    )
+
+    if manifest is not None:
+        return datasets, failures
+    if failures:
+        print_log(
+            f"Manifest not written, {len(failures)} scenes failed",
+            logger="current",
+            level=logging.WARNING,
+        )
+        return datasets, failures
+
+    files = [
+        path
+        for dataset, scene_args in zip(datasets, scenes_args)
+        for path in get_scene_files(dataset, scene_args)
+    ]
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "tile_size": tile_size,
+        "label_coverage_threshold": label_coverage_threshold,
+        "scene_params": get_scene_params_state(scene_params),
+        "files": {str(path): get_file_state(path) for path in files},
+        "scenes": [
+            {"args": [str(x) for x in scene_args], "tiles": scene_tiles}
+            for scene_args, scene_tiles in zip(scenes_args, tiles)
+        ],
+    }
+    save_manifest(manifest_path, manifest)
+    return datasets, failures
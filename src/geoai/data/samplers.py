@@ -0,0 +1,167 @@
+# Standard Library
+import math
+from typing import Iterator
+
+import torch
+from mmengine.dist import get_dist_info, sync_random_seed
+from mmengine.logging import print_log
+from mmseg.registry import DATA_SAMPLERS
+from torch.utils.data import ConcatDataset, Sampler
+
+from geoai.data.base import get_scene_subsets
+
+
+@DATA_SAMPLERS.register_module()
+class SceneChunkSampler(Sampler):
+    """
+    Shuffle chunks of spatially adjacent tiles instead of single tiles.
+
+    Tiles of every scene are grouped into bands of ``rows_per_band`` rows of the
+    scene's ImageTileIndexer grid, ordered column by column inside a band and cut
+    into chunks of ``chunk_size`` tiles. Every epoch the chunk order is shuffled
+    with ``seed + epoch`` and each rank gets a contiguous slice of the result, so
+    consecutive samples of a worker mostly come from the same file region.
+
+    Args:
+        dataset (ConcatDataset): Dataset of scene subsets.
+        shuffle (bool): Shuffle the chunk order. Defaults to True.
+        seed (int, optional): Random seed, synced across ranks when None.
+        round_up (bool): Pad indices so every rank gets the same number of
+            samples. Defaults to True.
+        chunk_size (int): Number of tiles per chunk. Defaults to 32.
+        rows_per_band (int): Tile rows per band. Defaults to 2.
+        batch_size (int): Batch size of the DataLoader, only used for the
+            logged band locality. Defaults to 1.
+        num_workers (int): Workers of the DataLoader, only used for the
+            logged band locality. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        dataset: ConcatDataset,
+        shuffle: bool = True,
+        seed: int | None = None,
+        round_up: bool = True,
+        chunk_size: int = 32,
+        rows_per_band: int = 2,
+        batch_size: int = 1,
+        num_workers: int = 0,
+    ) -> None:
+        rank, world_size = get_dist_info()
+        self.rank = rank
+        self.world_size = world_size
+        self.dataset = dataset
+        self.shuffle = shuffle
+        self.seed = sync_random_seed() if seed is None else seed
+        self.epoch = 0
+        self.round_up = round_up
+        self.chunk_size = chunk_size
+        self.rows_per_band = rows_per_band
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.band_locality = 0.0
+
+        self.chunks, self.bands = self._get_chunks()
+
+        if self.round_up:
+            self.num_samples = math.ceil(len(self.dataset) / world_size)
+            self.total_size = self.num_samples * self.world_size
+        else:
+            start, end = self._get_rank_slice(len(self.dataset))
+            self.num_samples = max(end - start, 0)
+            self.total_size = len(self.dataset)
+
+    def _get_chunks(self) -> tuple[list[list[int]], list[int]]:
+        """
+        Chunks of global dataset indexes and the band id of every global index.
+        """
+        chunks = []
+        bands = []
+        offset = 0
+        band_id = 0
+        for scene, tile_indexes in get_scene_subsets(self.dataset):
+            scene_bands = {}
+            indexer = getattr(scene, "indexer", None)
+            bands.extend([0] * len(tile_indexes))
+            for position, tile_index in enumerate(tile_indexes):
+                row, col = 0, position
+                if indexer is not None:
+                    row, col = indexer.index_to_row_col(tile_index)
+                band = row // self.rows_per_band
+                scene_bands.setdefault(band, []).append((col, row, offset + position))
+            for _, members in sorted(scene_bands.items()):
+                members = [index for _, _, index in sorted(members)]
+                for index in members:
+                    bands[index] = band_id
+                band_id += 1
+                for start in range(0, len(members), self.chunk_size):
+                    end = start + self.chunk_size
+                    chunks.append(members[start:end])
+            offset += len(tile_indexes)
+        return chunks, bands
+
+    def _get_rank_slice(self, size: int) -> tuple[int, int]:
+        per_rank = math.ceil(size / self.world_size)
+        return self.rank * per_rank, min((self.rank + 1) * per_rank, size)
+
+    def __iter__(self) -> Iterator[int]:
+        if self.shuffle:
+            g = torch.Generator()
+            g.manual_seed(self.seed + self.epoch)
+            order = torch.randperm(len(self.chunks), generator=g).tolist()
+        else:
+            order = range(len(self.chunks))
+        indices = [index for i in order for index in self.chunks[i]]
+
+        if self.round_up and indices:
+            indices = indices * int(self.total_size / len(indices) + 1)
+            start = self.rank * self.num_samples
+            end = start + self.num_samples
+            indices = indices[start:end]
+        else:
+            start, end = self._get_rank_slice(len(indices))
+            indices = indices[start:end]
+
+        self.band_locality = self.get_band_locality(indices)
+        print_log(
+            f"SceneChunkSampler epoch {self.epoch}: "
+            f"band locality {self.band_locality:.3f} "
+            f"(chunk_size={self.chunk_size}, rows_per_band={self.rows_per_band})",
+            logger="current",
+        )
+        return iter(indices)
+
+    def get_worker_streams(self, indices: list[int]) -> list[list[int]]:
+        """
+        Indices read by every DataLoader worker, in the order the worker reads them.
+
+        The DataLoader hands batches of batch_size samples to its workers in turn,
+        in the main process when num_workers is 0.
+        """
+        streams = [[] for _ in range(max(self.num_workers, 1))]
+        for i, start in enumerate(range(0, len(indices), self.batch_size)):
+            end = start + self.batch_size
+            streams[i % len(streams)].extend(indices[start:end])
+        return streams
+
+    def get_band_locality(self, indices: list[int]) -> float:
+        """
+        Share of samples from the same scene band as the previous sample of their worker.
+
+        An estimate of how often a worker reads from the file region it read
+        last, not a measured cache hit ratio.
+        """
+        hits, total = 0, 0
+        for stream in self.get_worker_streams(indices):
+            hits += sum(
+                self.bands[previous] == self.bands[current]
+                for previous, current in zip(stream[:-1], stream[1:])
+            )
+            total += max(len(stream) - 1, 0)
+        return hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
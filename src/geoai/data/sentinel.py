@@ -3,6 +3,7 @@ import os
 from pathlib import Path
 
 import geopandas as gpd
+from osgeo import gdal
 
 import geoai.config as config
 from geoai.utils import download_file
@@ -42,3 +43,11 @@ def recreate_index() -> None:
 def query_index(gdf: gpd.GeoDataFrame) -> None:
     if not sentinel2_index.exists():
         recreate_index()
+
+
+def get_rgb_subdataset_path(scene: Path) -> str:
+    """
+    Path of the RGB (last) subdataset of a Sentinel-2 L2A .SAFE product.
+    """
+    ds = gdal.Open(f"{scene}/MTD_MSIL2A.xml")
+    return ds.GetSubDatasets()[-1][0]
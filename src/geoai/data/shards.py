@@ -0,0 +1,168 @@
+# Standard Library
+import argparse
+import json
+import math
+import shutil
+from pathlib import Path
+
+import numpy as np
+from mmengine.dataset import BaseDataset
+from mmseg.registry import DATASETS
+from torch.utils.data import ConcatDataset
+
+from geoai.data.base import build_dataset, get_scene_subsets
+
+INDEX_FILE_NAME = "index.json"
+SHARD_SIZE = 1024
+
+
+def export_shards(
+    dataset: ConcatDataset,
+    out_path: Path,
+    shard_size: int = SHARD_SIZE,
+    overwrite: bool = False,
+) -> Path:
+    """
+    Write the image and label tiles of a tiled scene dataset into memory-mappable .npy shards.
+
+    Tiles are read in scene order with each scene's own ``get_data_info`` so
+    coverage filtering of the dataset is preserved. The index is written last,
+    a shard folder without an index is an interrupted export.
+    """
+    out_path = Path(out_path)
+    index_path = out_path / INDEX_FILE_NAME
+    if index_path.exists():
+        if not overwrite:
+            raise Exception("Shards already exist on disk")
+        shutil.rmtree(out_path)
+    out_path.mkdir(parents=True, exist_ok=True)
+
+    tiles = [
+        (scene, index)
+        for scene, indexes in get_scene_subsets(dataset)
+        for index in indexes
+    ]
+    index = {
+        "shard_size": shard_size,
+        "metainfo": dataset.metainfo,
+        "shards": [],
+        "tiles": [],
+    }
+    img_shard, label_shard = None, None
+    for i, (scene, tile_index) in enumerate(tiles):
+        print(f"Exporting tile: ({i}/{len(tiles)})", end="\r")
+        tile = scene.get_data_info(tile_index)
+        shard_index, position = divmod(i, shard_size)
+        if position == 0:
+            count = min(shard_size, len(tiles) - i)
+            name = f"shard-{shard_index:05d}"
+            img_shard = np.lib.format.open_memmap(
+                out_path / f"{name}.img.npy",
+                mode="w+",
+                dtype=tile["img"].dtype,
+                shape=(count, *tile["img"].shape),
+            )
+            label_shard = np.lib.format.open_memmap(
+                out_path / f"{name}.label.npy",
+                mode="w+",
+                dtype=tile["gt_seg_map"].dtype,
+                shape=(count, *tile["gt_seg_map"].shape),
+            )
+            index["shards"].append(
+                {"img": f"{name}.img.npy", "label": f"{name}.label.npy", "count": count}
+            )
+        img_shard[position] = tile["img"]
+        label_shard[position] = tile["gt_seg_map"]
+        if position == img_shard.shape[0] - 1:
+            img_shard.flush()
+            label_shard.flush()
+        index["tiles"].append(
+            [
+                str(tile["img_path"]),
+                str(tile["seg_map_path"]),
+                str(tile["img_meta"]["path"]),
+                [int(x) for x in tile["img_meta"]["srcWin"]],
+            ]
+        )
+    print(f"Exported tiles: {len(tiles)}", " " * 10)
+
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+    return index_path
+
+
+@DATASETS.register_module()
+class ShardTileDataset(BaseDataset):
+    """
+    Tiles exported with ``export_shards``, read from memory mapped shards.
+    """
+
+    def __init__(
+        self,
+        data_folder: Path,
+        pipeline: list[dict] | None = None,
+        metainfo: dict | None = None,
+    ) -> None:
+        self.data_folder = Path(data_folder)
+        with open(self.data_folder / INDEX_FILE_NAME) as f:
+            self.index = json.load(f)
+        self._shards = {}
+        if metainfo is None:
+            metainfo = self.index["metainfo"]
+        super().__init__(serialize_data=False, pipeline=pipeline, metainfo=metainfo)
+
+    def __getstate__(self) -> dict:
+        # Memory maps are reopened in every worker instead of being pickled as copies
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
+
+    def full_init(self) -> None:
+        super().full_init()
+        self.color_map = np.array(self.metainfo["palette"], dtype=np.uint8)
+
+    def load_data_list(self) -> list:
+        return self.index["tiles"]
+
+    def get_shard(self, shard_index: int) -> tuple[np.ndarray, np.ndarray]:
+        if shard_index not in self._shards:
+            shard = self.index["shards"][shard_index]
+            self._shards[shard_index] = (
+                np.load(self.data_folder / shard["img"], mmap_mode="r"),
+                np.load(self.data_folder / shard["label"], mmap_mode="r"),
+            )
+        return self._shards[shard_index]
+
+    def get_data_info(self, index: int) -> dict:
+        img_path, seg_map_path, path, src_win = self.data_list[index]
+        shard_index, position = divmod(index, self.index["shard_size"])
+        img_shard, label_shard = self.get_shard(shard_index)
+        res = {
+            "img_path": Path(img_path),
+            "seg_map_path": Path(seg_map_path),
+            "color_map": self.color_map,
+            "img": np.array(img_shard[position]),
+            "gt_seg_map": np.array(label_shard[position]),
+            "img_meta": {"path": path, "srcWin": src_win},
+        }
+        res["ori_shape"] = res["img"].shape[:2]
+        return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export dataset tiles to shards")
+    parser.add_argument("config", type=Path)
+    parser.add_argument("out_path", type=Path)
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    dataset = build_dataset(args.config, args.split)
+    shard_count = math.ceil(len(dataset) / args.shard_size)
+    print(f"Exporting {len(dataset)} tiles to {shard_count} shards")
+    export_shards(dataset, args.out_path, args.shard_size, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
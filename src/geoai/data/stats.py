@@ -0,0 +1,110 @@
+# Standard Library
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from torch.utils.data import ConcatDataset
+
+from geoai.data.base import build_dataset, get_raster_files, get_scene_subsets
+from geoai.data.utils import Image, RunningStats
+
+STATS_CACHE_DIR_NAME = ".stats_cache"
+
+
+def get_fingerprint(path: Path | str) -> str:
+    """
+    Key of a raster that changes when any of the files it is read from changes.
+    """
+    parts = []
+    for file in sorted(get_raster_files(path)):
+        if os.path.exists(file):
+            st = os.stat(file)
+            parts.append([file, st.st_size, st.st_mtime_ns])
+    key = json.dumps([str(path), parts])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def get_scene_stats(path: Path | str, cache_dir: Path | None = None) -> RunningStats:
+    """
+    Exact statistics and histograms of one raster, cached by its fingerprint.
+    """
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = Path(cache_dir) / f"{get_fingerprint(path)}.npz"
+        if cache_path.exists():
+            with np.load(cache_path) as state:
+                return RunningStats.from_dict(state)
+
+    # Processes already run in parallel, reading with one thread avoids oversubscription
+    stats = Image.from_path(path).get_running_stats(max_workers=1, histogram=True)
+
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path_temp = cache_path.with_suffix(f".{os.getpid()}.tmp.npz")
+        np.savez(cache_path_temp, **stats.to_dict())
+        os.replace(cache_path_temp, cache_path)
+    return stats
+
+
+def compute_dataset_stats(
+    paths: list[Path | str],
+    cache_dir: Path | None = None,
+    max_workers: int | None = None,
+) -> RunningStats:
+    """
+    Merge the statistics of all rasters, computed on a process pool.
+
+    Partial aggregates are merged exactly, so scenes of different sizes are
+    weighted by their pixel count. Only scenes missing from the cache are read.
+    """
+    if not paths:
+        raise ValueError("No image paths to compute the dataset statistics of")
+    if max_workers is None:
+        max_workers = min(os.cpu_count(), 12)
+
+    stats = None
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(get_scene_stats, str(path), cache_dir) for path in paths]
+        for i, future in enumerate(as_completed(futures)):
+            print(f"Calculating stats: ({i + 1}/{len(futures)})", end="\r")
+            scene_stats = future.result()
+            stats = scene_stats if stats is None else stats.merge(scene_stats)
+    print("")
+    return stats
+
+
+def get_dataset_image_paths(dataset: ConcatDataset) -> list[str]:
+    return [str(scene.get_image_path()) for scene, _ in get_scene_subsets(dataset)]
+
+
+def get_preprocessor_config(stats: RunningStats) -> dict:
+    """
+    ``mean`` and ``std`` ready to be used in a SegDataPreProcessor config.
+    """
+    return {
+        "mean": [float(x) for x in stats.mean],
+        "std": [float(x) for x in stats.std],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dataset normalization statistics")
+    parser.add_argument("config", type=Path)
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--max-workers", type=int, default=None)
+    args = parser.parse_args()
+
+    dataset = build_dataset(args.config, args.split)
+    cache_dir = Path(dataset.data_folder) / STATS_CACHE_DIR_NAME
+    stats = compute_dataset_stats(
+        get_dataset_image_paths(dataset), cache_dir, max_workers=args.max_workers
+    )
+    print(json.dumps(get_preprocessor_config(stats)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,17 @@
 from geoai.data.utils.image import Image
 from geoai.data.utils.indexer import ImageTileIndexer
+from geoai.data.utils.pool import DatasetPool, get_pool, open_dataset
+from geoai.data.utils.prefetch import TilePrefetcher
+from geoai.data.utils.render import stretch_to_uint8
+from geoai.data.utils.stats import RunningStats
 
-__all__ = [Image, ImageTileIndexer]
+__all__ = [
+    "Image",
+    "ImageTileIndexer",
+    "DatasetPool",
+    "RunningStats",
+    "TilePrefetcher",
+    "get_pool",
+    "open_dataset",
+    "stretch_to_uint8",
+]
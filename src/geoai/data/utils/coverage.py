@@ -0,0 +1,73 @@
+# Standard Library
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+from geoai.data.utils.image import Image
+from geoai.data.utils.prefetch import TilePrefetcher
+
+
+def get_coverage_cache_path(label_path: Path, tile_size: int) -> Path:
+    return Path(label_path).with_suffix(f".coverage{tile_size}.npy")
+
+
+def compute_tile_coverage(
+    image: Image, tile_size: int, tiles_per_block: int = 1, prefetch: int = 2
+) -> np.ndarray:
+    """
+    Label pixel sum of every tile divided by the tile area, in ImageTileIndexer order.
+
+    The raster is read in strips of tiles_per_block tile rows, padded to whole
+    tiles, and reduced with a reshape/sum, so peak memory is bounded by the
+    prefetched strips and not by the scene size.
+    """
+    nrows = math.ceil(image.height / tile_size)
+    ncols = math.ceil(image.width / tile_size)
+    strip_height = tile_size * tiles_per_block
+    coverage = np.zeros((nrows, ncols), dtype=np.float64)
+    path = image.path or image.get_dataset().GetDescription()
+    assert path, "Coverage can only be computed for images stored on disk"
+
+    windows = [
+        [0, top, ncols * tile_size, strip_height]
+        for top in range(0, image.height, strip_height)
+    ]
+    prefetcher = TilePrefetcher(path, windows, prefetch=prefetch, interleave="band")
+    for (window,), batch in prefetcher:
+        arr = batch[0]
+        block_sum = arr.reshape(
+            arr.shape[0], tiles_per_block, tile_size, ncols, tile_size
+        ).sum(axis=(0, 2, 4), dtype=np.int64)
+        row = window[1] // tile_size
+        end = min(row + tiles_per_block, nrows)
+        coverage[row:end] = block_sum[: end - row]
+
+    return coverage.reshape(-1) / (tile_size * tile_size)
+
+
+def get_tile_coverage(
+    label_path: Path,
+    tile_size: int,
+    cache_path: Path | None = None,
+    overwrite: bool = False,
+) -> np.ndarray:
+    """
+    Tile coverage of label_path, persisted next to it and reused until the label file changes.
+    """
+    label_path = Path(label_path)
+    if cache_path is None:
+        cache_path = get_coverage_cache_path(label_path, tile_size)
+    if (
+        not overwrite
+        and cache_path.exists()
+        and cache_path.stat().st_mtime_ns >= label_path.stat().st_mtime_ns
+    ):
+        return np.load(cache_path)
+
+    coverage = compute_tile_coverage(Image.from_pool(label_path), tile_size)
+    cache_path_temp = cache_path.with_suffix(f".{os.getpid()}.tmp.npy")
+    np.save(cache_path_temp, coverage)
+    os.replace(cache_path_temp, cache_path)
+    return coverage
@@ -1,25 +1,57 @@
 # Standard Library
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
-from osgeo import gdal
+from osgeo import gdal, gdal_array
 from pyproj import CRS, Transformer
 from shapely.geometry import Polygon, box
 from shapely.ops import transform
 
+from geoai.data.utils.pool import open_dataset
+from geoai.data.utils.stats import RunningStats, get_histogram_size
+
 # from typing import Self
 Self = "Self"
 
+STATS_WINDOW_SIZE = 1024
+STATS_MAX_WORKERS = 8
+APPROX_MIN_PIXELS = 2**20
+
 
 class Image:
-    def __init__(self, ds: gdal.Dataset, meta: dict | None = None) -> None:
-        self.ds = ds
+    def __init__(
+        self,
+        ds: gdal.Dataset | None,
+        meta: dict | None = None,
+        path: Path | str | None = None,
+    ) -> None:
+        assert (ds is None) != (path is None)
+        self._ds = ds
+        self.path = path
         self.meta = meta
         if self.meta is None:
             self.meta = {}
 
+    def __getstate__(self) -> dict:
+        if self.path is None:
+            raise Exception("Only images opened from a pool can be pickled.")
+        state = self.__dict__.copy()
+        state["_ds"] = None
+        return state
+
+    @property
+    def ds(self) -> gdal.Dataset:
+        return self.get_dataset()
+
     def get_dataset(self) -> gdal.Dataset:
-        return self.ds
+        if self.path is not None:
+            # Not cached on the image, so a forked worker reopens through its own
+            # pool and evicted handles are really closed
+            return open_dataset(self.path)
+        return self._ds
 
     @property
     def data(self) -> np.ndarray:
@@ -29,6 +61,67 @@ class Image:
             arr = arr[None]
         return arr
 
+    @property
+    def dtype(self) -> np.dtype:
+        data_type = self.get_dataset().GetRasterBand(1).DataType
+        return np.dtype(gdal_array.GDALTypeCodeToNumericTypeCode(data_type))
+
+    @property
+    def count(self) -> int:
+        return self.get_dataset().RasterCount
+
+    def read_window(
+        self,
+        xoff: int,
+        yoff: int,
+        xsize: int,
+        ysize: int,
+        out: np.ndarray | None = None,
+        interleave: str = "pixel",
+        fill_value: int | float = 0,
+    ) -> np.ndarray:
+        """
+        Read a pixel window straight into out, without an intermediate dataset or copy.
+
+        With interleave="pixel" out has shape (ysize, xsize, bands), with "band" it
+        has shape (bands, ysize, xsize), single band images also accept a 2D out.
+        GDAL converts to the dtype of out. Parts of the window outside the raster,
+        e.g. for edge tiles, are filled with fill_value.
+        """
+        if interleave == "pixel":
+            shape = (ysize, xsize, self.count)
+        elif interleave == "band":
+            shape = (self.count, ysize, xsize)
+        else:
+            raise ValueError(f"Unknown interleave: {interleave}")
+
+        if out is None:
+            out = np.empty(shape, dtype=self.dtype)
+        buf = out
+        if out.ndim == 2 and self.count == 1:
+            buf = out[..., None] if interleave == "pixel" else out[None]
+        assert buf.shape == shape, f"Expected buffer of shape {shape}, got {out.shape}"
+
+        x_start, y_start = max(xoff, 0), max(yoff, 0)
+        x_end, y_end = min(xoff + xsize, self.width), min(yoff + ysize, self.height)
+        if x_end - x_start < xsize or y_end - y_start < ysize:
+            out.fill(fill_value)
+        if x_end <= x_start or y_end <= y_start:
+            return out
+
+        rows = slice(y_start - yoff, y_end - yoff)
+        cols = slice(x_start - xoff, x_end - xoff)
+        view = buf[rows, cols] if interleave == "pixel" else buf[:, rows, cols]
+        self.get_dataset().ReadAsArray(
+            x_start,
+            y_start,
+            x_end - x_start,
+            y_end - y_start,
+            buf_obj=view,
+            interleave=interleave,
+        )
+        return out
+
     @property
     def bbox(self) -> Polygon:
         return box(*self.bounds)
@@ -88,26 +181,124 @@ class Image:
         assert isinstance(path, (Path, str))
         return cls.from_gdal(gdal.Open(str(path)))
 
+    @classmethod
+    def from_pool(cls, path: Path | str) -> Self:
+        """
+        Image backed by the per-process dataset pool, reopened lazily after fork or pickle.
+        """
+        assert isinstance(path, (Path, str))
+        return cls(None, path=str(path))
+
     @classmethod
     def from_meta(cls, meta: dict) -> Self:
         ds = gdal.Translate(
             "",
-            str(meta["path"]),
+            open_dataset(meta["path"]),
             options=gdal.TranslateOptions(format="MEM", srcWin=meta["srcWin"]),
         )
         return cls(ds, meta=meta)
 
-    def get_stats(self) -> dict:
+    def get_windows(self, size: int = STATS_WINDOW_SIZE) -> list[list[int]]:
+        """
+        [xoff, yoff, xsize, ysize] windows of at most size x size pixels covering the image.
+
+        Windows are aligned to the native blocks when the blocks fit in size, rows
+        of stripped images are split in size wide windows.
+        """
+        block_x, block_y = self.get_dataset().GetRasterBand(1).GetBlockSize()
+        xsize = block_x * (size // block_x) if block_x <= size else size
+        ysize = block_y * (size // block_y) if block_y <= size else size
+        return [
+            [x, y, min(xsize, self.width - x), min(ysize, self.height - y)]
+            for y in range(0, self.height, ysize)
+            for x in range(0, self.width, xsize)
+        ]
+
+    def get_overview_data(
+        self, min_pixels: int = APPROX_MIN_PIXELS
+    ) -> np.ndarray | None:
+        """
+        Data of the coarsest overview with at least min_pixels pixels, None without overviews.
+        """
+        ds = self.get_dataset()
+        band = ds.GetRasterBand(1)
+        if band.GetOverviewCount() == 0:
+            return None
+        level = 0
+        for i in range(band.GetOverviewCount()):
+            overview = band.GetOverview(i)
+            if overview.XSize * overview.YSize >= min_pixels:
+                level = i
+        return np.stack(
+            [
+                ds.GetRasterBand(i + 1).GetOverview(level).ReadAsArray()
+                for i in range(self.count)
+            ]
+        )
+
+    def get_running_stats(
+        self,
+        max_workers: int | None = None,
+        approx: bool = False,
+        histogram: bool = False,
+    ) -> RunningStats:
+        """
+        Stream the image window by window and merge the partial statistics of every window.
+
+        Windows are read on a thread pool, every thread opens its own handle as
+        GDAL datasets must not be shared between threads. Images without a path,
+        e.g. MEM datasets, are read serially. max_workers defaults to at most
+        STATS_MAX_WORKERS threads to bound the memory of the windows in flight.
+        histogram=True also counts every value of uint8 and uint16 images.
+        """
+        if max_workers is None:
+            max_workers = min(os.cpu_count(), STATS_MAX_WORKERS)
+        histogram_size = get_histogram_size(self.dtype) if histogram else 0
+        if approx:
+            arr = self.get_overview_data()
+            if arr is not None:
+                return RunningStats.from_array(arr, histogram_size=histogram_size)
+
+        path = self.path or self.get_dataset().GetDescription()
+        local = threading.local()
+
+        def get_window_stats(window: list[int]) -> RunningStats:
+            if not path:
+                ds = self.get_dataset()
+            else:
+                if getattr(local, "ds", None) is None:
+                    local.ds = gdal.Open(str(path))
+                ds = local.ds
+            arr = ds.ReadAsArray(*window)
+            arr = arr.reshape(-1, window[3], window[2])
+            return RunningStats.from_array(arr, histogram_size=histogram_size)
+
+        stats = RunningStats(self.count, histogram_size=histogram_size)
+        windows = self.get_windows()
+        if not path or max_workers == 1:
+            for window in windows:
+                stats.merge(get_window_stats(window))
+            return stats
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for window_stats in pool.map(get_window_stats, windows):
+                stats.merge(window_stats)
+        return stats
+
+    def get_stats(self, max_workers: int | None = None, approx: bool = False) -> dict:
+        """
+        Per band statistics computed with constant memory, see get_running_stats.
+
+        approx=True reads the coarsest overview that is still large enough
+        instead of the full resolution data when the image has overviews.
+        """
+        running_stats = self.get_running_stats(max_workers=max_workers, approx=approx)
         stats = {}
-        arr = self.data
-        stats["shape"] = arr.shape
-        stats["size"] = arr.size
-        view = arr.reshape(arr.shape[0], -1)
-        stats["max"] = view.max(-1)
-        stats["min"] = view.min(-1)
-        stats["mean"] = view.mean(-1)
-        stats["std"] = view.std(-1)
-        stats["variance"] = ((view - stats["mean"].reshape(-1, 1)) ** 2).sum(
-            -1
-        ) / view.shape[-1]
+        stats["shape"] = (self.count, self.height, self.width)
+        stats["size"] = self.count * self.height * self.width
+        stats["max"] = running_stats.max.astype(self.dtype)
+        stats["min"] = running_stats.min.astype(self.dtype)
+        stats["mean"] = running_stats.mean
+        stats["std"] = running_stats.std
+        stats["variance"] = running_stats.variance
         return stats
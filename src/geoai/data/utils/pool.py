@@ -0,0 +1,99 @@
+# Standard Library
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from osgeo import gdal
+
+MAX_OPEN_DATASETS = 64
+
+
+class DatasetPool:
+    """
+    Per-process LRU pool of open ``gdal.Dataset`` handles.
+
+    Handles are never shared between processes, the pool empties itself when
+    it is used from a forked child or after being unpickled and reopens
+    datasets lazily on the next request.
+    """
+
+    def __init__(self, max_open: int = MAX_OPEN_DATASETS) -> None:
+        assert max_open > 0
+        self.max_open = max_open
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._handles = OrderedDict()
+        self._pid = os.getpid()
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def __contains__(self, path: Path | str) -> bool:
+        return str(path) in self._handles
+
+    def __getstate__(self) -> dict:
+        return {"max_open": self.max_open}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            # Inherited handles share file descriptors with the parent
+            self._handles = OrderedDict()
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, path: Path | str) -> gdal.Dataset:
+        key = str(path)
+        self._check_pid()
+        with self._lock:
+            ds = self._handles.get(key)
+            if ds is not None:
+                self._handles.move_to_end(key)
+                self.hits += 1
+                return ds
+            self.misses += 1
+
+        ds = gdal.Open(key)
+        if ds is None:
+            raise Exception(f"Unable to open dataset: {key}")
+
+        with self._lock:
+            self._handles[key] = ds
+            self._handles.move_to_end(key)
+            while len(self._handles) > self.max_open:
+                # Evicted handles close once the reads still using them are done
+                self._handles.popitem(last=False)
+        return ds
+
+    def discard(self, path: Path | str) -> None:
+        self._check_pid()
+        with self._lock:
+            self._handles.pop(str(path), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._handles.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+
+_pool = DatasetPool()
+
+
+def get_pool() -> DatasetPool:
+    return _pool
+
+
+def open_dataset(path: Path | str) -> gdal.Dataset:
+    return _pool.get(path)
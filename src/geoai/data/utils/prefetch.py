@@ -0,0 +1,96 @@
+# Standard Library
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from geoai.data.utils.image import Image
+
+PREFETCH_BATCHES = 4
+
+
+class TilePrefetcher:
+    """
+    Read batches of windows ahead on a thread pool and yield them in order.
+
+    At most ``prefetch`` batches are read or waiting at any time, a slow
+    consumer stops further reads. Every thread opens its own handle of the
+    image since GDAL datasets must not be shared between threads, GDAL
+    releases the GIL while decoding so reads overlap with the consumer.
+
+    Args:
+        path (Path | str): Image to read.
+        windows (list[list[int]]): [xoff, yoff, xsize, ysize] of every window,
+            all of the same size, windows may extend beyond the image.
+        batch_size (int): Windows per yielded batch.
+        prefetch (int): Batches read ahead.
+        dtype (np.dtype, optional): Dtype of the batches, the image dtype by default.
+        interleave (str): "pixel" for (ysize, xsize, bands) windows, "band"
+            for (bands, ysize, xsize).
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        windows: list[list[int]],
+        batch_size: int = 1,
+        prefetch: int = PREFETCH_BATCHES,
+        dtype: np.dtype | None = None,
+        interleave: str = "pixel",
+    ) -> None:
+        self.path = str(path)
+        self.windows = windows
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.interleave = interleave
+        self._local = threading.local()
+
+        image = Image.from_path(self.path)
+        self.dtype = image.dtype if dtype is None else dtype
+        self.bands = image.count
+
+    def __len__(self) -> int:
+        return -(-len(self.windows) // self.batch_size)
+
+    def get_image(self) -> Image:
+        if getattr(self._local, "image", None) is None:
+            self._local.image = Image.from_path(self.path)
+        return self._local.image
+
+    def read_batch(self, windows: list[list[int]]) -> np.ndarray:
+        _, _, xsize, ysize = windows[0]
+        if self.interleave == "pixel":
+            shape = (len(windows), ysize, xsize, self.bands)
+        else:
+            shape = (len(windows), self.bands, ysize, xsize)
+        batch = np.empty(shape, dtype=self.dtype)
+        image = self.get_image()
+        for i, window in enumerate(windows):
+            image.read_window(*window, out=batch[i], interleave=self.interleave)
+        return batch
+
+    def get_batches(self) -> list[list[list[int]]]:
+        batches = []
+        for start in range(0, len(self.windows), self.batch_size):
+            end = start + self.batch_size
+            batches.append(self.windows[start:end])
+        return batches
+
+    def __iter__(self) -> Iterator[tuple[list[list[int]], np.ndarray]]:
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.prefetch) as pool:
+            try:
+                for windows in self.get_batches():
+                    if len(pending) == self.prefetch:
+                        ready_windows, future = pending.popleft()
+                        yield ready_windows, future.result()
+                    pending.append((windows, pool.submit(self.read_batch, windows)))
+                while pending:
+                    ready_windows, future = pending.popleft()
+                    yield ready_windows, future.result()
+            finally:
+                for _, future in pending:
+                    future.cancel()
@@ -0,0 +1,95 @@
+import numpy as np
+
+# Largest lookup table, one entry per uint16 value
+MAX_LUT_SIZE = 2**16
+
+
+def get_lut_size(arr: np.ndarray) -> int:
+    """
+    Entries of a lookup table indexed by the values of arr.
+
+    0 when arr does not hold integers in [0, MAX_LUT_SIZE), e.g. floats.
+    """
+    if arr.dtype == np.uint8:
+        return 256
+    if not np.issubdtype(arr.dtype, np.integer) or arr.size == 0:
+        return 0
+    if arr.min() < 0 or arr.max() >= MAX_LUT_SIZE:
+        return 0
+    return 256 if arr.max() < 256 else MAX_LUT_SIZE
+
+
+def get_band_histograms(arr: np.ndarray, size: int) -> np.ndarray:
+    """
+    (bands, size) count of every value of each band of a channel last arr.
+    """
+    view = arr.reshape(-1, arr.shape[-1])
+    return np.stack(
+        [np.bincount(view[:, i], minlength=size) for i in range(view.shape[1])]
+    )
+
+
+def get_histogram_percentiles(
+    histogram: np.ndarray, percents: list[float]
+) -> np.ndarray:
+    """
+    (len(percents), bands) nearest rank percentiles of (bands, size) histograms.
+    """
+    cdf = np.cumsum(histogram, axis=-1)
+    total = cdf[:, -1:]
+    ranks = np.maximum(np.ceil(np.asarray(percents) / 100 * total), 1)
+    return np.stack(
+        [
+            np.searchsorted(band_cdf, band_ranks)
+            for band_cdf, band_ranks in zip(cdf, ranks)
+        ],
+        axis=-1,
+    )
+
+
+def get_stretch_lut(low: np.ndarray, high: np.ndarray, size: int) -> np.ndarray:
+    """
+    (bands, size) uint8 table mapping low to 0 and high to 255 for every band.
+    """
+    values = np.arange(size, dtype=np.float32)
+    low = np.asarray(low, dtype=np.float32).reshape(-1, 1)
+    high = np.asarray(high, dtype=np.float32).reshape(-1, 1)
+    scale = 255 / np.maximum(high - low, 1)
+    return np.clip((values - low) * scale, 0, 255).astype(np.uint8)
+
+
+def apply_lut(arr: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    out = np.empty(arr.shape, dtype=np.uint8)
+    for i in range(arr.shape[-1]):
+        out[..., i] = lut[i][arr[..., i]]
+    return out
+
+
+def stretch_to_uint8(
+    arr: np.ndarray,
+    percent_clip: list[float] | None = None,
+    histogram: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Percentile contrast stretch of a channel last image to uint8.
+
+    For integer images the percentiles are read from per band histograms and
+    the pixels are mapped with a lookup table, no float copy of the image is
+    made. The percentiles come from histogram when given, e.g. the
+    ``RunningStats.histogram`` of the whole dataset so all tiles share one
+    stretch, otherwise from arr itself. Float images fall back to np.percentile.
+    """
+    if percent_clip is None:
+        percent_clip = [0, 100]
+    size = get_lut_size(arr)
+    if histogram is not None and 0 < size <= histogram.shape[-1]:
+        size = histogram.shape[-1]
+    elif size:
+        histogram = get_band_histograms(arr, size)
+    else:
+        low, high = np.percentile(arr.reshape(-1, arr.shape[-1]), percent_clip, axis=0)
+        arr = np.clip((arr - low) / np.maximum(high - low, 1e-12), 0, 1)
+        return (arr * 255).astype(np.uint8)
+
+    low, high = get_histogram_percentiles(histogram, percent_clip)
+    return apply_lut(arr, get_stretch_lut(low, high, size))
@@ -0,0 +1,144 @@
+# Standard Library
+import math
+from concurrent.futures import Executor
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry.base import BaseGeometry
+
+
+class SeamMerger:
+    """
+    Dissolve polygons of a regular window grid as windows complete.
+
+    Polygons that only touch their own window are final as soon as the window
+    is added. Polygons that reach the edge of a neighbouring window are held,
+    merged with the polygons they intersect and released once every window
+    they touch has been added. Memory scales with the polygons along window
+    seams and not with the area of the grid.
+
+    Args:
+        origin (tuple[float, float]): x and y of the corner of window (0, 0).
+        window_size (tuple[float, float]): Width and height of a window, rows
+            and columns grow with y and x.
+        shape (tuple[int, int]): Number of window rows and columns.
+        margin (float): Distance from a seam within which polygons are held,
+            when polygons of a window can reach that far into its neighbours.
+        executor (Executor, optional): Pool on which released groups of
+            polygons are unioned in parallel.
+    """
+
+    def __init__(
+        self,
+        origin: tuple[float, float],
+        window_size: tuple[float, float],
+        shape: tuple[int, int],
+        margin: float = 0,
+        executor: Executor | None = None,
+    ) -> None:
+        self.origin = origin
+        self.window_size = window_size
+        self.shape = shape
+        self.executor = executor
+        self.tolerance = 1e-9 * max(window_size) + margin
+        self.done = np.zeros(shape, dtype=bool)
+        self.held = []
+
+    def get_windows(
+        self, bounds: tuple[float, float, float, float]
+    ) -> tuple[slice, slice]:
+        """
+        Rows and columns of the windows touched by bounds.
+        """
+        xmin, ymin, xmax, ymax = bounds
+        x0, y0 = self.origin
+        width, height = self.window_size
+        nrows, ncols = self.shape
+        rows = slice(
+            max(math.floor((ymin - y0 - self.tolerance) / height), 0),
+            min(math.floor((ymax - y0 + self.tolerance) / height), nrows - 1) + 1,
+        )
+        cols = slice(
+            max(math.floor((xmin - x0 - self.tolerance) / width), 0),
+            min(math.floor((xmax - x0 + self.tolerance) / width), ncols - 1) + 1,
+        )
+        return rows, cols
+
+    def is_interior(self, geometry: BaseGeometry, row: int, col: int) -> bool:
+        rows, cols = self.get_windows(geometry.bounds)
+        return rows == slice(row, row + 1) and cols == slice(col, col + 1)
+
+    def add(
+        self,
+        row: int,
+        col: int,
+        geometries: list[BaseGeometry],
+        dissolve: bool = False,
+    ) -> list[BaseGeometry]:
+        """
+        Mark window (row, col) as complete and return the polygons that became final.
+
+        With dissolve=True the polygons of the window are merged first, e.g.
+        when the window was computed from several overlapping sources.
+        """
+        geometries = np.asarray(geometries, dtype=object)
+        if dissolve and len(geometries):
+            geometries = shapely.get_parts(shapely.union_all(geometries))
+        self.done[row, col] = True
+
+        final = []
+        for geometry in geometries:
+            if self.is_interior(geometry, row, col):
+                final.append(geometry)
+            else:
+                self.held.append(geometry)
+        final.extend(self.release())
+        return final
+
+    def get_components(self) -> list[list[int]]:
+        """
+        Groups of held polygons connected by intersection.
+        """
+        parents = list(range(len(self.held)))
+
+        def find(i: int) -> int:
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        tree = STRtree(self.held)
+        for i, j in zip(*tree.query(self.held, predicate="intersects")):
+            parents[find(i)] = find(j)
+
+        components = {}
+        for i in range(len(self.held)):
+            components.setdefault(find(i), []).append(i)
+        return list(components.values())
+
+    def release(self) -> list[BaseGeometry]:
+        if not self.held:
+            return []
+        final = []
+        held = []
+        for component in self.get_components():
+            geometries = [self.held[i] for i in component]
+            bounds = shapely.total_bounds(geometries)
+            if self.done[self.get_windows(bounds)].all():
+                final.append(geometries)
+            else:
+                held.extend(geometries)
+        self.held = held
+        if self.executor is not None and len(final) > 1:
+            unions = list(self.executor.map(shapely.union_all, final))
+        else:
+            unions = [shapely.union_all(geometries) for geometries in final]
+        return [part for union in unions for part in shapely.get_parts(union)]
+
+    def flush(self) -> list[BaseGeometry]:
+        """
+        Merge and return all held polygons, e.g. when some windows are never added.
+        """
+        self.done[:] = True
+        return self.release()
@@ -0,0 +1,110 @@
+import numpy as np
+
+# Integer types small enough for a histogram with one bin per value
+HISTOGRAM_DTYPES = (np.uint8, np.uint16)
+
+# from typing import Self
+Self = "Self"
+
+
+class RunningStats:
+    """
+    Mergeable per band count, sum, M2, min and max.
+
+    Partial statistics of disjoint blocks are combined with the parallel
+    algorithm of Chan et al., so the result does not depend on how the data was split.
+    """
+
+    def __init__(self, bands: int, histogram_size: int = 0) -> None:
+        self.count = 0
+        self.sum = np.zeros(bands, dtype=np.float64)
+        self.m2 = np.zeros(bands, dtype=np.float64)
+        self.min = np.full(bands, np.inf, dtype=np.float64)
+        self.max = np.full(bands, -np.inf, dtype=np.float64)
+        self.histogram = None
+        if histogram_size:
+            self.histogram = np.zeros((bands, histogram_size), dtype=np.int64)
+
+    @classmethod
+    def from_array(cls, arr: np.ndarray, histogram_size: int = 0) -> Self:
+        """
+        Statistics of arr with shape (bands, ...).
+
+        With histogram_size, arr must hold integers in [0, histogram_size) and
+        a per band count of every value is kept as well.
+        """
+        view = arr.reshape(arr.shape[0], -1)
+        stats = cls(view.shape[0], histogram_size=histogram_size)
+        if stats.histogram is not None:
+            for i, band in enumerate(view):
+                stats.histogram[i] = np.bincount(band, minlength=histogram_size)
+        if view.shape[1] == 0:
+            return stats
+        stats.count = view.shape[1]
+        stats.sum = view.sum(-1, dtype=np.float64)
+        mean = stats.sum / stats.count
+        stats.m2 = ((view - mean.reshape(-1, 1)) ** 2).sum(-1)
+        stats.min = view.min(-1).astype(np.float64)
+        stats.max = view.max(-1).astype(np.float64)
+        return stats
+
+    def merge(self, other: Self) -> Self:
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        count = self.count + other.count
+        delta = other.sum / other.count - self.sum / self.count
+        self.m2 = self.m2 + other.m2 + delta**2 * self.count * other.count / count
+        self.sum = self.sum + other.sum
+        self.count = count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        if self.histogram is not None and other.histogram is not None:
+            self.histogram = self.histogram + other.histogram
+        else:
+            self.histogram = None
+        return self
+
+    def to_dict(self) -> dict:
+        state = {
+            "count": np.array(self.count),
+            "sum": self.sum,
+            "m2": self.m2,
+            "min": self.min,
+            "max": self.max,
+        }
+        if self.histogram is not None:
+            state["histogram"] = self.histogram
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict) -> Self:
+        stats = cls(len(state["sum"]))
+        stats.count = int(state["count"])
+        stats.sum = np.asarray(state["sum"], dtype=np.float64)
+        stats.m2 = np.asarray(state["m2"], dtype=np.float64)
+        stats.min = np.asarray(state["min"], dtype=np.float64)
+        stats.max = np.asarray(state["max"], dtype=np.float64)
+        if "histogram" in state:
+            stats.histogram = np.asarray(state["histogram"], dtype=np.int64)
+        return stats
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.sum / self.count
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / self.count
+
+    @property
+    def std(self) -> np.ndarray:
+        return self.variance**0.5
+
+
+def get_histogram_size(dtype: np.dtype) -> int:
+    if np.dtype(dtype) in HISTOGRAM_DTYPES:
+        return 2 ** (8 * np.dtype(dtype).itemsize)
+    return 0
@@ -1,6 +1,9 @@
 # Standard Library
+import os
+import threading
 import time
 from contextlib import contextmanager
+from typing import Iterator
 
 import docker
 from sqlalchemy import Connection, Engine, create_engine
@@ -9,6 +12,11 @@ from geoai import config
 
 CONTAINER_NAME = "geoai_postgres"
 
+_lock = threading.Lock()
+_container_checked = False
+_engine = None
+_engine_pid = None
+
 
 def start_container() -> None:
     remove_container()
@@ -51,26 +59,70 @@ def remove_container() -> None:
 
 
 def ensure_container() -> None:
+    """
+    Start the container when it is not running, checked once per process.
+    """
+    global _container_checked
+    if _container_checked:
+        return
     if not check_container():
         start_container()
+    _container_checked = True
+
+
+def reset_engine() -> None:
+    """
+    Drop the engine without closing its connections, which belong to the parent after a fork.
+    """
+    global _engine, _engine_pid
+    if _engine is not None:
+        _engine.dispose(close=False)
+    _engine = None
+    _engine_pid = None
+
+
+def _after_fork_in_child() -> None:
+    global _lock
+    # The lock may have been held by another thread of the parent
+    _lock = threading.Lock()
+    reset_engine()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
 
 
-@contextmanager
 def get_engine() -> Engine:
-    ensure_container()
-    engine = create_engine(
-        f"postgresql://{config.POSTGRES_USER}:@localhost:{config.POSTGRES_PORT}/{config.POSTGRES_DB_NAME}",
-        pool_size=100,
-        max_overflow=0,
-    )
-    yield engine
-    engine.dispose()
+    """
+    Engine shared by all threads of the process, created on first use.
+
+    The pool holds config.POSTGRES_POOL_SIZE connections and pings them before
+    use, so connections dropped by a container restart are replaced. A forked
+    process creates its own engine, checked by pid in case the fork hook did
+    not run.
+    """
+    global _engine, _engine_pid
+    with _lock:
+        if _engine is not None and _engine_pid != os.getpid():
+            reset_engine()
+        if _engine is None:
+            ensure_container()
+            _engine = create_engine(
+                f"postgresql://{config.POSTGRES_USER}:@localhost:{config.POSTGRES_PORT}/{config.POSTGRES_DB_NAME}",
+                pool_size=config.POSTGRES_POOL_SIZE,
+                max_overflow=config.POSTGRES_MAX_OVERFLOW,
+                pool_pre_ping=True,
+            )
+            _engine_pid = os.getpid()
+        return _engine
 
 
 @contextmanager
-def get_connection() -> Connection:
-    with get_engine() as engine:
-        yield engine.connect()
+def get_connection() -> Iterator[Connection]:
+    """
+    Connection from the process pool, returned to the pool on exit.
+    """
+    with get_engine().connect() as connection:
+        yield connection
 
 
 def main() -> None:
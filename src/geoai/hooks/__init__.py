@@ -0,0 +1,4 @@
+from geoai.hooks.profiling_hook import DataPipelineProfilingHook
+from geoai.hooks.visualization_hook import CustomSegVisualizationHook
+
+__all__ = ["CustomSegVisualizationHook", "DataPipelineProfilingHook"]
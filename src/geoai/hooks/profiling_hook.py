@@ -0,0 +1,126 @@
+# Standard Library
+import time
+from typing import Callable
+
+import numpy as np
+import torch
+from mmengine.hooks import Hook
+from mmengine.logging import print_log
+from mmengine.model import is_model_wrapper
+from mmengine.runner import Runner
+from mmseg.registry import HOOKS
+
+from geoai.utils import timer
+
+
+@HOOKS.register_module()
+class DataPipelineProfilingHook(Hook):
+    """
+    Profile where the time of a training iteration goes.
+
+    Per iteration it records the time spent waiting for the dataloader, the
+    data preprocessor (host to device copy and normalization) and the rest of
+    the train step (forward, backward and optimizer step). The per tile stage
+    timings of the scene datasets, packed as the ``timings`` meta key, are
+    collected from the data samples. Every ``interval`` iterations the
+    quantiles of each timing are logged as scalars to the vis backends.
+
+    Args:
+        interval (int): Iterations between logged summaries.
+        quantiles (tuple[float]): Quantiles logged for every timing.
+        synchronize (bool): Synchronize CUDA around the preprocessor and the
+            train step, needed for accurate device timings but it stalls the
+            pipeline every iteration. Defaults to False.
+    """
+
+    priority = "VERY_LOW"
+
+    def __init__(
+        self,
+        interval: int = 50,
+        quantiles: tuple[float] = (0.5, 0.9, 0.99),
+        synchronize: bool = False,
+    ) -> None:
+        self.interval = interval
+        self.quantiles = quantiles
+        self.synchronize = synchronize and torch.cuda.is_available()
+        self.timings = {}
+        self._iter_timings = {}
+        self._last_iter_end = None
+        self._iter_start = None
+
+    def sync(self) -> None:
+        if self.synchronize:
+            torch.cuda.synchronize()
+
+    def wrap_preprocessor(self, forward: Callable) -> Callable:
+        def profiled_forward(*args: tuple, **kwargs: dict) -> dict:
+            self.sync()
+            with timer(self._iter_timings, "data_preprocessor"):
+                data = forward(*args, **kwargs)
+                self.sync()
+            return data
+
+        return profiled_forward
+
+    def before_train(self, runner: Runner) -> None:
+        model = runner.model.module if is_model_wrapper(runner.model) else runner.model
+        preprocessor = model.data_preprocessor
+        preprocessor.forward = self.wrap_preprocessor(preprocessor.forward)
+
+    def before_train_epoch(self, runner: Runner) -> None:
+        # The time since the last iteration is not spent waiting for data
+        self._last_iter_end = None
+
+    def after_val_epoch(self, runner: Runner, metrics: dict | None = None) -> None:
+        # Validation runs between two train iterations
+        self._last_iter_end = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.timings.setdefault(name, []).append(seconds)
+
+    def before_train_iter(
+        self, runner: Runner, batch_idx: int, data_batch: dict | None = None
+    ) -> None:
+        now = time.perf_counter()
+        if self._last_iter_end is not None:
+            self.add("dataloader_wait", now - self._last_iter_end)
+        self._iter_timings = {}
+        self._iter_start = now
+
+    def after_train_iter(
+        self,
+        runner: Runner,
+        batch_idx: int,
+        data_batch: dict | None = None,
+        outputs: dict | None = None,
+    ) -> None:
+        self.sync()
+        now = time.perf_counter()
+        preprocessor = self._iter_timings.get("data_preprocessor", 0.0)
+        self.add("data_preprocessor", preprocessor)
+        self.add("train_step", now - self._iter_start - preprocessor)
+
+        for data_sample in (data_batch or {}).get("data_samples", []):
+            for name, seconds in data_sample.metainfo.get("timings", {}).items():
+                self.add(f"dataset_{name}", seconds)
+
+        if self.every_n_train_iters(runner, self.interval):
+            self.log(runner)
+        # Time spent in other hooks is not counted as dataloader wait
+        self._last_iter_end = time.perf_counter()
+
+    def log(self, runner: Runner) -> None:
+        scalars = {}
+        summary = []
+        for name, values in self.timings.items():
+            if not values:
+                continue
+            values = np.array(values) * 1000
+            for q, value in zip(self.quantiles, np.quantile(values, self.quantiles)):
+                scalars[f"profile/{name}_p{round(q * 100)}_ms"] = float(value)
+            scalars[f"profile/{name}_mean_ms"] = float(values.mean())
+            summary.append(f"{name}={np.median(values):.1f}ms")
+        runner.visualizer.add_scalars(scalars, step=runner.iter + 1)
+        print_log("Profile (median): " + " ".join(summary), logger="current")
+        self.timings = {}
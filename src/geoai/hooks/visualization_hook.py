@@ -1,17 +1,104 @@
 # Standard Library
+import queue
+import threading
 from typing import Sequence
 
 import numpy as np
+from mmengine.logging import print_log
 from mmengine.runner import Runner
 from mmseg.engine.hooks.visualization_hook import SegVisualizationHook
 from mmseg.registry import HOOKS
 from mmseg.structures import SegDataSample
 
-from geoai.data.utils import Image
+from geoai.data.utils import Image, stretch_to_uint8
 
 
 @HOOKS.register_module()
 class CustomSegVisualizationHook(SegVisualizationHook):
+    """
+    Segmentation visualization that renders on a background thread.
+
+    The image of every drawn sample is taken from the pixels already loaded in
+    ``data_batch["inputs"]``, falling back to reading ``img_meta`` from disk
+    only when the inputs are missing. Normalization, drawing and writing to the
+    vis backends run on a worker thread fed by a queue of ``queue_size``
+    samples. When the worker falls behind new samples are dropped instead of
+    stalling the validation loop. Images are stretched to uint8 with
+    ``stretch_to_uint8`` using ``backend_args["percent_clip"]``.
+    """
+
+    def __init__(self, *args: tuple, queue_size: int = 8, **kwargs: dict) -> None:
+        super().__init__(*args, **kwargs)
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._queue = None
+        self._worker = None
+        self._histogram = None
+
+    def get_histogram(self) -> np.ndarray | None:
+        """
+        Dataset histogram for the stretch from ``backend_args["histogram_file"]``.
+
+        The file is an npz of ``RunningStats.to_dict()`` with histograms, e.g.
+        the result of ``compute_dataset_stats``. Without it every sample is
+        stretched with its own percentiles.
+        """
+        if self._histogram is None and self.backend_args is not None:
+            histogram_file = self.backend_args.get("histogram_file")
+            if histogram_file is not None:
+                with np.load(histogram_file) as state:
+                    self._histogram = state["histogram"]
+        return self._histogram
+
+    def get_queue(self) -> queue.Queue:
+        if self._worker is None:
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._worker = threading.Thread(target=self.render_worker, daemon=True)
+            self._worker.start()
+        return self._queue
+
+    def render_worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.render(*item)
+            except Exception as e:
+                print_log(f"Visualization failed: {e!r}", logger="current")
+            finally:
+                self._queue.task_done()
+
+    def render(
+        self,
+        window_name: str,
+        img: np.ndarray,
+        output: SegDataSample,
+        step: int,
+        percent_clip: list[int],
+    ) -> None:
+        img = stretch_to_uint8(img, percent_clip, self.get_histogram())
+
+        # Only this thread draws, the visualizer keeps the drawn image as state
+        self._visualizer.add_datasample(
+            window_name,
+            img,
+            data_sample=output,
+            show=self.show,
+            wait_time=self.wait_time,
+            step=step,
+        )
+
+    def get_image(self, data_batch: dict, i: int) -> np.ndarray:
+        """
+        Channel last pixels of sample i, read from disk when not in the batch.
+        """
+        inputs = data_batch.get("inputs")
+        if inputs is not None:
+            return np.array(inputs[i].permute(1, 2, 0).cpu().numpy())
+        img_meta = data_batch["data_samples"][i].img_meta
+        return np.transpose(Image.from_meta(img_meta).ds.ReadAsArray(), (1, 2, 0))
+
     def _after_iter(
         self,
         runner: Runner,
@@ -37,43 +124,32 @@ class CustomSegVisualizationHook(SegVisualizationHook):
             percent_clip = self.backend_args.get("percent_clip", percent_clip)
 
         if self.every_n_inner_iters(batch_idx, self.interval):
+            render_queue = self.get_queue()
             for i, output in enumerate(outputs):
-                # try:
                 img_meta = data_batch["data_samples"][i].img_meta
-
-                # Read Image
-                img = Image.from_meta(img_meta).ds.ReadAsArray()
-
-                # Image to channel last
-                img = np.transpose(img, (1, 2, 0))
-
-                # Get min max percentiles for clip normalization
-                min, max = np.percentile(img.reshape(-1, 3), percent_clip, axis=0)
-
-                # Min max normalization
-                img = (img - min) / (max - min)
-
-                # Clip outliers
-                img = np.clip(img, 0, 1)
-
-                # Convert image to uint8 range
-                img = (img * 255).astype(np.uint8)
-
                 srcWin_ = "_".join([str(x) for x in img_meta["srcWin"]])
                 window_name = f"""{mode}_{output.img_path.stem}_{srcWin_}"""
-
-                self._visualizer.add_datasample(
+                item = (
                     window_name,
-                    img,
-                    data_sample=output,
-                    show=self.show,
-                    wait_time=self.wait_time,
-                    step=runner.iter,
+                    self.get_image(data_batch, i),
+                    output.cpu(),
+                    runner.iter,
+                    percent_clip,
                 )
-                # except Exception as e:
-                #     print(e)
-
-                #     # Standard Library
-                #     import pdb
-
-                #     pdb.set_trace()
+                try:
+                    render_queue.put_nowait(item)
+                except queue.Full:
+                    self.dropped += 1
+
+    def after_val_epoch(self, runner: Runner, metrics: dict | None = None) -> None:
+        if self._queue is not None:
+            self._queue.join()
+        if self.dropped:
+            print_log(f"Visualization dropped {self.dropped} samples", logger="current")
+            self.dropped = 0
+
+    def after_run(self, runner: Runner) -> None:
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
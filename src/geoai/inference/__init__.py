@@ -0,0 +1,5 @@
+from geoai.inference.engine import SlidingWindowInference
+from geoai.inference.polygonize import VectorWriter, polygonize
+from geoai.inference.writer import GeoTiffWriter
+
+__all__ = ["SlidingWindowInference", "GeoTiffWriter", "VectorWriter", "polygonize"]
@@ -0,0 +1,45 @@
+# Standard Library
+import argparse
+import sys
+from pathlib import Path
+
+from geoai.inference.runner import run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m geoai.inference",
+        description="Predict .SAFE scenes or GeoTIFFs into GeoTIFF masks.",
+    )
+    parser.add_argument("config", type=Path)
+    parser.add_argument("checkpoint", type=Path)
+    parser.add_argument("inputs", nargs="+", help="Glob patterns of the scenes.")
+    parser.add_argument("--out-dir", type=Path, required=True)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=1, help="Threads per worker.")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--tile-size", type=int, default=512)
+    parser.add_argument("--padding", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    failures = run(
+        args.config,
+        args.checkpoint,
+        args.inputs,
+        args.out_dir,
+        workers=args.workers,
+        threads=args.threads,
+        device=args.device,
+        overwrite=args.overwrite,
+        tile_size=args.tile_size,
+        padding=args.padding,
+        batch_size=args.batch_size,
+    )
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
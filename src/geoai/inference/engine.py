@@ -0,0 +1,134 @@
+# Standard Library
+from pathlib import Path
+
+import numpy as np
+import torch
+from mmseg.apis import init_model
+from mmseg.structures import SegDataSample
+from torch import nn
+
+from geoai.data.utils import Image, ImageTileIndexer
+from geoai.data.utils.prefetch import PREFETCH_BATCHES, TilePrefetcher
+from geoai.inference.writer import GeoTiffWriter
+
+# from typing import Self
+Self = "Self"
+
+
+class SlidingWindowInference:
+    """
+    Predict a whole scene with overlapping windows and stream the result to a GeoTIFF.
+
+    The scene is split into ``tile_size`` tiles with ImageTileIndexer. Every
+    tile is read with ``padding`` pixels of context on each side by a
+    TilePrefetcher, so the next batches are read while the model runs. Windows
+    are predicted in batches of ``batch_size`` and only the tile in the center
+    of each prediction is written. Memory depends on the batch size and not on
+    the scene size.
+
+    Args:
+        model (nn.Module): mmseg segmentor, e.g. from ``mmseg.apis.init_model``.
+        tile_size (int): Size of the written center of each window.
+        padding (int): Context read around each tile.
+        batch_size (int): Windows per forward pass.
+        prefetch (int): Batches read ahead while the model runs.
+    """
+
+    def __init__(
+        self,
+        model: nn.Module,
+        tile_size: int = 512,
+        padding: int = 128,
+        batch_size: int = 8,
+        prefetch: int = PREFETCH_BATCHES,
+    ) -> None:
+        self.model = model
+        self.tile_size = tile_size
+        self.padding = padding
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.model.eval()
+
+    @classmethod
+    def from_config(
+        cls, config: Path, checkpoint: Path, device: str = "cpu", **kwargs: dict
+    ) -> Self:
+        model = init_model(str(config), str(checkpoint), device=device)
+        return cls(model, **kwargs)
+
+    @property
+    def window_size(self) -> int:
+        return self.tile_size + 2 * self.padding
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Class index of every pixel of a (batch, height, width, bands) array.
+        """
+        shape = batch.shape[1:3]
+        data = {
+            "inputs": [torch.from_numpy(x).permute(2, 0, 1) for x in batch],
+            "data_samples": [
+                SegDataSample(
+                    metainfo={
+                        "img_shape": shape,
+                        "ori_shape": shape,
+                        "pad_shape": shape,
+                    }
+                )
+                for _ in batch
+            ],
+        }
+        with torch.no_grad():
+            outputs = self.model.test_step(data)
+        return np.stack(
+            [x.pred_sem_seg.data[0].cpu().numpy().astype(np.uint8) for x in outputs]
+        )
+
+    def run(self, image_path: Path | str, out_path: Path, verbose: bool = True) -> Path:
+        """
+        Predict image_path into out_path, printing the progress when verbose.
+        """
+        image = Image.from_path(image_path)
+        indexer = ImageTileIndexer(image, self.tile_size)
+        tiles = [indexer[i] for i in range(len(indexer))]
+        windows = [
+            [
+                tile["offset_x"] - self.padding,
+                tile["offset_y"] - self.padding,
+                self.window_size,
+                self.window_size,
+            ]
+            for tile in tiles
+        ]
+        prefetcher = TilePrefetcher(
+            image_path,
+            windows,
+            batch_size=self.batch_size,
+            prefetch=self.prefetch,
+            # torch has no uint16 tensors
+            dtype=np.int32 if image.dtype == np.uint16 else image.dtype,
+        )
+
+        with GeoTiffWriter.like(image, out_path) as writer:
+            start = 0
+            for _, batch in prefetcher:
+                end = start + len(batch)
+                self.write_centers(writer, tiles[start:end], self.predict(batch))
+                start = end
+                if verbose:
+                    print(f"Predicted tiles: {end}/{len(tiles)}", end="\r")
+        if verbose:
+            print("")
+        return Path(out_path)
+
+    def write_centers(
+        self, writer: GeoTiffWriter, tiles: list[dict], predictions: np.ndarray
+    ) -> None:
+        for tile, prediction in zip(tiles, predictions):
+            rows = slice(self.padding, self.padding + tile["ysize"])
+            cols = slice(self.padding, self.padding + tile["xsize"])
+            writer.write(
+                np.ascontiguousarray(prediction[rows, cols]),
+                tile["offset_x"],
+                tile["offset_y"],
+            )
@@ -0,0 +1,149 @@
+# Standard Library
+from pathlib import Path
+
+import numpy as np
+import shapely
+from osgeo import gdal, gdal_array, ogr, osr
+from shapely.geometry.base import BaseGeometry
+
+from geoai.data.utils import Image, ImageTileIndexer, TilePrefetcher
+from geoai.data.utils.seams import SeamMerger
+
+# from typing import Self
+Self = "Self"
+
+VECTOR_DRIVERS = {".gpkg": "GPKG", ".parquet": "Parquet"}
+FEATURES_PER_TRANSACTION = 10000
+POLYGONIZE_TILE_SIZE = 1024
+
+
+class VectorWriter:
+    """
+    Polygon layer written incrementally to a GeoPackage or GeoParquet file.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        spatial_ref: osr.SpatialReference | None,
+        value_field: str = "value",
+    ) -> None:
+        self.path = Path(path)
+        driver_name = VECTOR_DRIVERS.get(self.path.suffix)
+        if driver_name is None:
+            raise Exception(f"Unsupported vector format: {self.path.suffix}")
+        self.ds = ogr.GetDriverByName(driver_name).CreateDataSource(str(self.path))
+        self.layer = self.ds.CreateLayer(
+            self.path.stem, srs=spatial_ref, geom_type=ogr.wkbPolygon
+        )
+        self.layer.CreateField(ogr.FieldDefn(value_field, ogr.OFTInteger))
+        self.value_field = value_field
+        self.count = 0
+        self.layer.StartTransaction()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: tuple) -> None:
+        self.close()
+
+    def write(self, geometries: list[BaseGeometry], value: int) -> None:
+        defn = self.layer.GetLayerDefn()
+        for geometry in geometries:
+            feature = ogr.Feature(defn)
+            feature.SetField(self.value_field, int(value))
+            feature.SetGeometry(ogr.CreateGeometryFromWkb(geometry.wkb))
+            self.layer.CreateFeature(feature)
+            self.count += 1
+            if self.count % FEATURES_PER_TRANSACTION == 0:
+                self.layer.CommitTransaction()
+                self.layer.StartTransaction()
+
+    def close(self) -> None:
+        if self.ds is None:
+            return
+        self.layer.CommitTransaction()
+        self.layer = None
+        self.ds = None
+
+
+def polygonize_window(arr: np.ndarray, xoff: int, yoff: int) -> dict:
+    """
+    Polygons of the non zero pixels of arr in pixel coordinates of the full raster.
+
+    Returns:
+        Polygons grouped by pixel value.
+    """
+    ds = gdal_array.OpenArray(np.ascontiguousarray(arr))
+    ds.SetGeoTransform((xoff, 1, 0, yoff, 0, 1))
+    band = ds.GetRasterBand(1)
+    vector_ds = ogr.GetDriverByName("Memory").CreateDataSource("")
+    layer = vector_ds.CreateLayer("polygons", geom_type=ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn("value", ogr.OFTInteger))
+    gdal.Polygonize(band, band, layer, 0, [])
+
+    polygons = {}
+    for feature in layer:
+        geometry = shapely.from_wkb(bytes(feature.GetGeometryRef().ExportToWkb()))
+        polygons.setdefault(feature.GetField("value"), []).append(geometry)
+    return polygons
+
+
+def to_map_coordinates(
+    geometries: list[BaseGeometry], geo_transform: tuple[float, ...]
+) -> np.ndarray:
+    x0, dx, rx, y0, ry, dy = geo_transform
+
+    def transform(coords: np.ndarray) -> np.ndarray:
+        x, y = coords[:, 0], coords[:, 1]
+        return np.column_stack([x0 + x * dx + y * rx, y0 + x * ry + y * dy])
+
+    return shapely.transform(np.asarray(geometries, dtype=object), transform)
+
+
+def polygonize(
+    mask_path: Path | str,
+    out_path: Path,
+    tile_size: int = POLYGONIZE_TILE_SIZE,
+    prefetch: int = 2,
+) -> Path:
+    """
+    Vectorize a segmentation mask window by window into a GeoPackage or GeoParquet file.
+
+    Windows are polygonized in pixel coordinates, so polygons of neighbouring
+    windows share exact edges, and stitched across window seams with a
+    SeamMerger per class value. Polygons are written as soon as they are
+    final, neither the full mask nor all polygons are held in memory.
+    """
+    image = Image.from_path(mask_path)
+    geo_transform = image.ds.GetGeoTransform()
+    indexer = ImageTileIndexer(image, tile_size)
+    shape = (indexer.nrows, indexer.ncols)
+    windows = []
+    for i in range(len(indexer)):
+        top, left = indexer.index_to_offset(i)
+        windows.append([left, top, tile_size, tile_size])
+    prefetcher = TilePrefetcher(
+        mask_path, windows, prefetch=prefetch, interleave="band"
+    )
+
+    done = np.zeros(shape, dtype=bool)
+    mergers = {}
+    with VectorWriter(out_path, image.ds.GetSpatialRef()) as writer:
+        for i, ((window,), batch) in enumerate(prefetcher):
+            print(f"Polygonized windows: {i + 1}/{len(windows)}", end="\r")
+            xoff, yoff = window[0], window[1]
+            row, col = yoff // tile_size, xoff // tile_size
+            polygons = polygonize_window(batch[0, 0], xoff, yoff)
+            for value in polygons:
+                if value not in mergers:
+                    mergers[value] = SeamMerger((0, 0), (tile_size, tile_size), shape)
+                    mergers[value].done[:] = done
+            done[row, col] = True
+            for value, merger in mergers.items():
+                final = merger.add(row, col, polygons.get(value, []))
+                writer.write(to_map_coordinates(final, geo_transform), value)
+        for value, merger in mergers.items():
+            writer.write(to_map_coordinates(merger.flush(), geo_transform), value)
+    print("")
+    return Path(out_path)
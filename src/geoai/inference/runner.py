@@ -0,0 +1,155 @@
+# Standard Library
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import torch
+from mmengine.logging import print_log
+
+from geoai.data.sentinel import get_rgb_subdataset_path
+from geoai.inference.engine import SlidingWindowInference
+
+TIMINGS_FILE_NAME = "timings.jsonl"
+
+# SlidingWindowInference of the worker process, built once by init_worker
+_engine = None
+
+
+def resolve_inputs(patterns: list[str]) -> list[Path]:
+    """
+    Scenes matching the glob patterns, .SAFE folders and GeoTIFFs.
+    """
+    paths = []
+    for pattern in patterns:
+        paths.extend(Path(x) for x in sorted(glob.glob(pattern)))
+    return list(dict.fromkeys(paths))
+
+
+def get_image_path(scene: Path) -> str:
+    if scene.suffix == ".SAFE":
+        return get_rgb_subdataset_path(scene)
+    return str(scene)
+
+
+def get_output_path(scene: Path, out_dir: Path) -> Path:
+    return out_dir / f"{scene.stem}.tif"
+
+
+def check_inputs(scenes: list[Path], out_dir: Path) -> None:
+    """
+    Raise when scenes would share an output or are inside out_dir.
+    """
+    out_dir = out_dir.resolve()
+    inside = [x for x in scenes if out_dir in x.resolve().parents]
+    if inside:
+        raise Exception(f"Scenes inside the output directory {out_dir}: {inside}")
+    by_output = {}
+    for scene in scenes:
+        by_output.setdefault(get_output_path(scene, out_dir), []).append(scene)
+    collisions = [x for x in by_output.values() if len(x) > 1]
+    if collisions:
+        raise Exception(f"Scenes with the same output name: {collisions}")
+
+
+def init_worker(
+    config: Path, checkpoint: Path, device: str, threads: int, kwargs: dict
+) -> None:
+    global _engine
+    torch.set_num_threads(threads)
+    _engine = SlidingWindowInference.from_config(config, checkpoint, device, **kwargs)
+
+
+def run_scene(scene: Path, out_path: Path) -> dict:
+    """
+    Predict one scene into a temporary file, moved to out_path once complete.
+    """
+    out_path_temp = out_path.with_suffix(f".{os.getpid()}.tmp")
+    start = time.perf_counter()
+    # Workers share the terminal, progress is logged per scene by run
+    _engine.run(get_image_path(scene), out_path_temp, verbose=False)
+    shutil.move(out_path_temp, out_path)
+    return {
+        "scene": str(scene),
+        "out_path": str(out_path),
+        "seconds": time.perf_counter() - start,
+        "pid": os.getpid(),
+    }
+
+
+def run(
+    config: Path,
+    checkpoint: Path,
+    inputs: list[str],
+    out_dir: Path,
+    workers: int = 1,
+    threads: int = 1,
+    device: str = "cpu",
+    overwrite: bool = False,
+    **kwargs: dict,
+) -> list[dict]:
+    """
+    Predict every scene matched by inputs on a pool of worker processes.
+
+    Every worker builds its own model once and is limited to ``threads`` torch
+    threads so that workers do not oversubscribe the cores. Scenes whose
+    output already exists are skipped, outputs are written to a temporary
+    file first so an interrupted run never leaves a partial output behind.
+    Scenes must not be inside out_dir and must have distinct names, their
+    outputs would overwrite or skip each other otherwise.
+    The timing of every scene is appended to timings.jsonl in out_dir.
+
+    Returns:
+        Scenes that failed with their error.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    scenes = resolve_inputs(inputs)
+    check_inputs(scenes, out_dir)
+    todo = [
+        scene
+        for scene in scenes
+        if overwrite or not get_output_path(scene, out_dir).exists()
+    ]
+    print_log(
+        f"Scenes: {len(scenes)}, skipped: {len(scenes) - len(todo)}",
+        logger="current",
+    )
+
+    failures = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        # CUDA and the GDAL handles of the parent must not be forked
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(config, checkpoint, device, threads, kwargs),
+    ) as pool, open(out_dir / TIMINGS_FILE_NAME, "a") as timings:
+        futures = {
+            pool.submit(run_scene, scene, get_output_path(scene, out_dir)): scene
+            for scene in todo
+        }
+        for i, future in enumerate(as_completed(futures)):
+            scene = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                print_log(
+                    f"scene={scene} status=failed error={e!r}",
+                    logger="current",
+                    level=logging.WARNING,
+                )
+                failures.append({"scene": str(scene), "error": repr(e)})
+                continue
+            timings.write(json.dumps(record) + "\n")
+            timings.flush()
+            print_log(
+                f"[{i + 1}/{len(todo)}] scene={scene} "
+                f"seconds={record['seconds']:.1f}",
+                logger="current",
+            )
+    return failures
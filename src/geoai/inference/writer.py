@@ -0,0 +1,118 @@
+# Standard Library
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+from osgeo import gdal, osr
+
+from geoai.data.utils import Image
+
+# from typing import Self
+Self = "Self"
+
+WRITER_QUEUE_SIZE = 16
+BLOCK_SIZE = 512
+
+
+class GeoTiffWriter:
+    """
+    Tiled, compressed GeoTIFF written window by window on a background thread.
+
+    ``write`` blocks once ``queue_size`` windows are waiting, which bounds the
+    memory held by pending results. Errors of the writer thread are raised on
+    the next ``write`` or on ``close``.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        width: int,
+        height: int,
+        geo_transform: tuple[float, ...],
+        spatial_ref: osr.SpatialReference | None,
+        bands: int = 1,
+        data_type: int = gdal.GDT_Byte,
+        nodata: int | float | None = None,
+        queue_size: int = WRITER_QUEUE_SIZE,
+    ) -> None:
+        self.path = Path(path)
+        self.ds = gdal.GetDriverByName("GTiff").Create(
+            str(self.path),
+            width,
+            height,
+            bands=bands,
+            eType=data_type,
+            options=[
+                "TILED=YES",
+                f"BLOCKXSIZE={BLOCK_SIZE}",
+                f"BLOCKYSIZE={BLOCK_SIZE}",
+                "COMPRESS=DEFLATE",
+                "BIGTIFF=IF_SAFER",
+            ],
+        )
+        self.ds.SetGeoTransform(geo_transform)
+        if spatial_ref is not None:
+            self.ds.SetSpatialRef(spatial_ref)
+        if nodata is not None:
+            for i in range(bands):
+                self.ds.GetRasterBand(i + 1).SetNoDataValue(nodata)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def like(cls, image: Image, path: Path, **kwargs: dict) -> Self:
+        ds = image.get_dataset()
+        return cls(
+            path,
+            image.width,
+            image.height,
+            ds.GetGeoTransform(),
+            ds.GetSpatialRef(),
+            **kwargs,
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: tuple) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            arr, xoff, yoff = item
+            try:
+                if arr.ndim == 2:
+                    self.ds.GetRasterBand(1).WriteArray(arr, xoff, yoff)
+                else:
+                    self.ds.WriteArray(arr, xoff, yoff)
+            except Exception as e:
+                self._error = e
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise Exception(f"Writing {self.path} failed") from self._error
+
+    def write(self, arr: np.ndarray, xoff: int, yoff: int) -> None:
+        """
+        Queue arr, (ysize, xsize) or (bands, ysize, xsize), to be written at xoff, yoff.
+        """
+        self._raise_error()
+        self._queue.put((arr, xoff, yoff))
+
+    def close(self) -> None:
+        if self.ds is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self.ds.FlushCache()
+        self.ds = None
+        self._raise_error()
@@ -1,6 +1,9 @@
 # Standard Library
 import shutil
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 
 import requests
 
@@ -38,3 +41,15 @@ def download_file(
     shutil.move(file_path_temp, file_path)
 
     return file_path
+
+
+@contextmanager
+def timer(timings: dict, name: str) -> Iterator[None]:
+    """
+    Add the seconds spent in the block to timings[name].
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start